@@ -0,0 +1,318 @@
+"""Prueba de carga reproducible de las rutas del backend.
+
+Levanta `main.app` con uvicorn dentro del mismo proceso, siembra usuarios y
+pedidos, y lanza peticiones concurrentes contra cada ruta. El reporte (JSON)
+incluye throughput y latencias p50/p95/p99 por ruta.
+
+Uso (desde backend/):
+    python bench/loadtest.py --users 50 --orders 500 --concurrency 20 --output bench.json
+    python bench/loadtest.py --in-memory --baseline bench/baseline.json
+
+Con `--baseline` termina con código 1 si alguna ruta empeora más que
+`--max-regression` en p95 o throughput respecto al archivo guardado, o si
+tiene más errores que en él.
+"""
+import argparse
+import asyncio
+import io
+import json
+import os
+import random
+import socket
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+BENCH_PASSWORD = "bench-password"
+ROUTES = [
+    "/register",
+    "/token",
+    "/users/me",
+    "/request-service",
+    "/my-requests",
+    "/orders",
+    "/orders/{order_id}/invoice",
+    "/admin/download-payment/{order_id}",
+]
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Prueba de carga del backend de MarketingCRM")
+    parser.add_argument("--mongo-uri", default=os.getenv("BENCH_MONGO_URI", "mongodb://localhost:27017"))
+    parser.add_argument("--database", default="MarketingCRM_bench")
+    parser.add_argument("--in-memory", action="store_true", help="Usa mongomock-motor en lugar de un mongod")
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--orders", type=int, default=200)
+    parser.add_argument("--image-ratio", type=float, default=0.5, help="Fracción de pedidos sembrados con comprobante")
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--requests", type=int, default=200, help="Peticiones por ruta")
+    parser.add_argument("--routes", nargs="*", default=ROUTES)
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--output", help="Archivo donde guardar el reporte JSON")
+    parser.add_argument("--baseline", help="Reporte anterior con el que comparar")
+    parser.add_argument("--max-regression", type=float, default=0.2)
+    return parser.parse_args(argv)
+
+
+def configure_environment(args, blob_dir: str):
+    """Variables de entorno que config.py lee al importarse."""
+    os.environ["MONGO_DETAILS"] = args.mongo_uri
+    os.environ["DATABASE_NAME"] = args.database
+    os.environ.setdefault("SECRET_KEY", "bench-secret")
+    os.environ.setdefault("ALGORITHM", "HS256")
+    if args.in_memory:
+        # GridFS no está disponible en mongomock
+        os.environ["BLOB_BACKEND"] = "local"
+        os.environ["BLOB_LOCAL_DIR"] = blob_dir
+        os.environ["ENSURE_INDEXES_ON_STARTUP"] = "false"
+
+
+def use_in_memory_mongo():
+    try:
+        from mongomock_motor import AsyncMongoMockClient
+    except ImportError:
+        sys.exit("--in-memory requiere `pip install mongomock-motor`")
+    import database
+
+    def client_factory(*args, **kwargs):
+        return AsyncMongoMockClient()
+
+    database.AsyncIOMotorClient = client_factory
+
+
+def sample_image(seed: int) -> bytes:
+    from PIL import Image
+    rnd = random.Random(seed)
+    image = Image.new("RGB", (1200, 900), (rnd.randint(0, 255), rnd.randint(0, 255), rnd.randint(0, 255)))
+    output = io.BytesIO()
+    image.save(output, format="JPEG", quality=90)
+    return output.getvalue()
+
+
+async def seed_data(app, args):
+    """Inserta usuarios y pedidos directamente en la base de datos."""
+    from utils import hash_password
+    from routers.dependencies import create_access_token
+
+    rnd = random.Random(args.seed)
+    db = app.mongodb
+    await db["users"].delete_many({"email": {"$regex": "^bench-"}})
+    hashed = hash_password(BENCH_PASSWORD)
+    users = [{
+        "email": f"bench-user-{i}@example.com",
+        "hashed_password": hashed,
+        "role": "user",
+        "name": f"Cliente {i}",
+        "idType": "CC",
+        "idNumber": str(100000 + i),
+        "phone": "3000000000",
+        "address": f"Calle {i}",
+    } for i in range(args.users)]
+    users.append({"email": "bench-admin@example.com", "hashed_password": hashed, "role": "admin", "name": "Admin"})
+    result = await db["users"].insert_many(users)
+    for user, inserted_id in zip(users, result.inserted_ids):
+        user["_id"] = inserted_id
+
+    image = sample_image(args.seed)
+    now = datetime.utcnow()
+    orders = []
+    for i in range(args.orders):
+        owner = users[rnd.randrange(args.users)]
+        order = {
+            "order_id": f"B{i:07d}",
+            "user_id": str(owner["_id"]),
+            "client_name": owner["name"],
+            "serviceType": rnd.choice(["SEO", "Ads", "Social"]),
+            "amount": round(rnd.uniform(10, 500), 2),
+            "transfer_id": f"T{i}",
+            "status": rnd.choice(["Procesando Pago", "Aprobado", "Finalizado"]),
+            "created_at": now - timedelta(minutes=i),
+        }
+        if rnd.random() < args.image_ratio:
+            order["file"] = await app.blob_store.save_bytes(image, f"{order['order_id']}.jpg", "image/jpeg")
+            order["file"]["status"] = "ready"
+        orders.append(order)
+    await db["orders"].delete_many({"order_id": {"$regex": "^B"}})
+    if orders:
+        await db["orders"].insert_many(orders)
+
+    tokens = {
+        user["email"]: create_access_token({"sub": user["email"], "role": user["role"]}, timedelta(hours=2))
+        for user in users
+    }
+    return {
+        "users": users[:-1],
+        "admin": users[-1],
+        "tokens": tokens,
+        "order_ids": [o["order_id"] for o in orders],
+        "image_order_ids": [o["order_id"] for o in orders if "file" in o],
+        "image": image,
+    }
+
+
+def build_requests(route: str, data: dict, run_id: str):
+    """Devuelve una función `i -> (método, url, kwargs)` para la ruta."""
+    rnd = random.Random(route)
+    users = data["users"]
+    admin_headers = {"Authorization": f"Bearer {data['tokens'][data['admin']['email']]}"}
+
+    def user_headers(i):
+        return {"Authorization": f"Bearer {data['tokens'][users[i % len(users)]['email']]}"}
+
+    if route == "/register":
+        return lambda i: ("POST", "/register", {"json": {"email": f"bench-new-{run_id}-{i}@example.com", "password": BENCH_PASSWORD}})
+    if route == "/token":
+        return lambda i: ("POST", "/token", {"data": {"username": users[i % len(users)]["email"], "password": BENCH_PASSWORD}})
+    if route == "/users/me":
+        return lambda i: ("GET", "/users/me", {"headers": user_headers(i)})
+    if route == "/request-service":
+        return lambda i: ("POST", "/request-service", {
+            "headers": user_headers(i),
+            "data": {"serviceType": "SEO", "amount": "100", "transfer_id": f"bench-{run_id}-{i}"},
+            "files": {"file": ("comprobante.jpg", data["image"], "image/jpeg")},
+        })
+    if route == "/my-requests":
+        return lambda i: ("GET", "/my-requests", {"headers": user_headers(i)})
+    if route == "/orders":
+        return lambda i: ("GET", "/orders", {"headers": admin_headers})
+    if route == "/orders/{order_id}/invoice":
+        ids = data["order_ids"]
+        return lambda i: ("GET", f"/orders/{rnd.choice(ids)}/invoice", {"headers": admin_headers})
+    if route == "/admin/download-payment/{order_id}":
+        ids = data["image_order_ids"]
+        return lambda i: ("GET", f"/admin/download-payment/{rnd.choice(ids)}", {"headers": admin_headers})
+    raise ValueError(f"Ruta desconocida: {route}")
+
+
+def percentile(sorted_values, fraction: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(fraction * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+async def run_route(client, make_request, total: int, concurrency: int) -> dict:
+    latencies = []
+    errors = 0
+    counter = iter(range(total))
+
+    async def worker():
+        nonlocal errors
+        for i in counter:
+            method, url, kwargs = make_request(i)
+            started = time.perf_counter()
+            response = await client.request(method, url, **kwargs)
+            await response.aread()
+            latencies.append(time.perf_counter() - started)
+            if response.status_code >= 400:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    return {
+        "requests": total,
+        "errors": errors,
+        "throughput_rps": round(total / elapsed, 2) if elapsed else 0.0,
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 0.95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 2),
+    }
+
+
+def compare_with_baseline(report: dict, baseline: dict, max_regression: float) -> list:
+    regressions = []
+    for route, base in baseline.get("routes", {}).items():
+        current = report["routes"].get(route)
+        if current is None:
+            continue
+        # Una ruta que empieza a fallar rápido mejora la latencia: los errores cuentan primero
+        if current["errors"] > base.get("errors", 0):
+            regressions.append(f"{route}: errores {base.get('errors', 0)} -> {current['errors']}")
+        if base["p95_ms"] and current["p95_ms"] > base["p95_ms"] * (1 + max_regression):
+            regressions.append(f"{route}: p95 {base['p95_ms']} -> {current['p95_ms']} ms")
+        if base["throughput_rps"] and current["throughput_rps"] < base["throughput_rps"] * (1 - max_regression):
+            regressions.append(f"{route}: throughput {base['throughput_rps']} -> {current['throughput_rps']} rps")
+    return regressions
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def main_async(args) -> dict:
+    import httpx
+    import uvicorn
+
+    blob_dir = tempfile.mkdtemp(prefix="bench-blobs-")
+    configure_environment(args, blob_dir)
+    if args.in_memory:
+        use_in_memory_mongo()
+    from main import app
+
+    # Un servidor uvicorn real: las tareas en segundo plano no cuentan en la latencia medida
+    port = free_port()
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning", lifespan="on"))
+    server_task = asyncio.create_task(server.serve())
+    while not server.started:
+        if server_task.done():
+            server_task.result()
+        await asyncio.sleep(0.05)
+
+    try:
+        data = await seed_data(app, args)
+        run_id = str(int(time.time()))
+        report = {
+            "meta": {
+                "users": args.users,
+                "orders": args.orders,
+                "image_ratio": args.image_ratio,
+                "concurrency": args.concurrency,
+                "requests_per_route": args.requests,
+                "in_memory": args.in_memory,
+                "python": sys.version.split()[0],
+            },
+            "routes": {},
+        }
+        limits = httpx.Limits(max_connections=args.concurrency)
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", limits=limits, timeout=60) as client:
+            for route in args.routes:
+                make_request = build_requests(route, data, run_id)
+                report["routes"][route] = await run_route(client, make_request, args.requests, args.concurrency)
+                print(f"{route}: {report['routes'][route]}", file=sys.stderr)
+        if not args.in_memory:
+            await app.mongodb_client.drop_database(args.database)
+        return report
+    finally:
+        server.should_exit = True
+        await server_task
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    report = asyncio.run(main_async(args))
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as fh:
+            fh.write(output + "\n")
+    print(output)
+
+    if args.baseline:
+        with open(args.baseline) as fh:
+            baseline = json.load(fh)
+        regressions = compare_with_baseline(report, baseline, args.max_regression)
+        if regressions:
+            print("Regresiones respecto a la línea base:", file=sys.stderr)
+            for line in regressions:
+                print(f"  {line}", file=sys.stderr)
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""Microbenchmark del costo de serializar el listado de pedidos.
+
+Compara, por cada 1.000 pedidos, el camino anterior (diccionarios armados a
+mano + `jsonable_encoder` + `JSONResponse`) con el actual (modelos tipados +
+`ORJSONResponse`), replicando lo que hace FastAPI con `response_model`.
+
+Uso (desde backend/):
+    python bench/serialization.py --orders 1000 --repeat 50
+"""
+import argparse
+import json
+import os
+import sys
+import timeit
+from datetime import datetime, timedelta
+from bson import ObjectId
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, ORJSONResponse
+from pydantic import TypeAdapter
+from models.order_models import OrderListPage, order_list_item_from_doc
+
+
+def sample_orders(count: int) -> list:
+    now = datetime.utcnow()
+    return [{
+        "_id": ObjectId(),
+        "order_id": str(10000 + i),
+        "client_name": f"Cliente {i}",
+        "serviceType": "SEO",
+        "transfer_id": f"T{i}",
+        "file": {"filename": f"comprobante_{i}.jpg"},
+        "status": "Procesando Pago",
+        "created_at": now - timedelta(minutes=i),
+    } for i in range(count)]
+
+
+def serialize_before(orders: list) -> bytes:
+    items = [
+        {
+            "order_id": order["order_id"],
+            "client_name": order.get("client_name", "Desconocido"),
+            "serviceType": order["serviceType"],
+            "transfer_id": order["transfer_id"],
+            "file_name": order["file"]["filename"] if "file" in order else None,
+            "status": order["status"],
+            "created_at": order["created_at"],
+        }
+        for order in orders
+    ]
+    return JSONResponse(jsonable_encoder({"items": items, "next_cursor": None})).body
+
+
+_page_adapter = TypeAdapter(OrderListPage)
+
+
+def serialize_after(orders: list) -> bytes:
+    page = OrderListPage(items=[order_list_item_from_doc(order) for order in orders], next_cursor=None)
+    # Igual que FastAPI con `response_model`: validar el valor devuelto y volcarlo en modo JSON
+    content = _page_adapter.dump_python(_page_adapter.validate_python(page), mode="json")
+    return ORJSONResponse(content).body
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--orders", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args(argv)
+
+    orders = sample_orders(args.orders)
+    assert json.loads(serialize_before(orders))["items"][0]["order_id"] == json.loads(serialize_after(orders))["items"][0]["order_id"]
+
+    results = {}
+    for name, func in (("before", serialize_before), ("after", serialize_after)):
+        best = min(timeit.repeat(lambda: func(orders), number=1, repeat=args.repeat))
+        results[name] = {"ms_per_1000_orders": round(best * 1000 * 1000 / args.orders, 3)}
+    results["speedup"] = round(results["before"]["ms_per_1000_orders"] / results["after"]["ms_per_1000_orders"], 2)
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
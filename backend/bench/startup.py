@@ -0,0 +1,140 @@
+"""Costo de arranque de un worker: tiempo de importación y memoria (RSS).
+
+Importa `main` (o el módulo indicado) en un proceso nuevo con
+`python -X importtime`, varias veces, y reporta en JSON la mediana del
+tiempo de importación, el RSS al terminar, los módulos más costosos y qué
+librerías pesadas quedaron cargadas.
+
+Uso (desde backend/):
+    python bench/startup.py --repeat 5 --output startup.json
+    python bench/startup.py --baseline bench/startup-baseline.json
+
+Con `--baseline` termina con código 1 si el tiempo de importación o el RSS
+empeoran más que `--max-regression` respecto al archivo guardado.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY_MODULES = ["PIL", "fpdf", "jose", "passlib", "motor", "pymongo", "orjson"]
+
+# Se ejecuta en el proceso hijo: importa el módulo y devuelve RSS y módulos pesados
+CHILD_SCRIPT = """
+import importlib, json, resource, sys, time
+started = time.perf_counter()
+importlib.import_module(sys.argv[1])
+elapsed = time.perf_counter() - started
+rss_kb = None
+try:
+    with open("/proc/self/status") as fh:
+        for line in fh:
+            if line.startswith("VmRSS:"):
+                rss_kb = int(line.split()[1])
+except OSError:
+    pass
+if rss_kb is None:
+    # En Linux ru_maxrss viene en KB; en macOS en bytes
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    rss_kb = maxrss // 1024 if sys.platform == "darwin" else maxrss
+heavy = [name for name in json.loads(sys.argv[2]) if name in sys.modules]
+print(json.dumps({"import_seconds": elapsed, "rss_kb": rss_kb, "heavy_modules_loaded": heavy}))
+"""
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Tiempo de importación y memoria por worker del backend")
+    parser.add_argument("--module", default="main")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15, help="Módulos más costosos a incluir en el reporte")
+    parser.add_argument("--output", help="Archivo donde guardar el reporte JSON")
+    parser.add_argument("--baseline", help="Reporte anterior con el que comparar")
+    parser.add_argument("--max-regression", type=float, default=0.2)
+    return parser.parse_args(argv)
+
+
+def child_environment() -> dict:
+    """config.py exige estas variables al importarse; no se abre ninguna conexión."""
+    env = dict(os.environ)
+    env.setdefault("MONGO_DETAILS", "mongodb://localhost:27017")
+    env.setdefault("DATABASE_NAME", "MarketingCRM_startup")
+    env.setdefault("SECRET_KEY", "startup-secret")
+    env.setdefault("ALGORITHM", "HS256")
+    return env
+
+
+def parse_importtime(stderr: str) -> list:
+    """Convierte la salida de `-X importtime` en `[(módulo, propio_us, acumulado_us)]` de primer nivel."""
+    modules = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        # Solo los módulos importados directamente: los anidados vienen con sangría
+        if name.startswith(" ") and not name.startswith("  "):
+            modules.append((name.strip(), int(self_us), int(cumulative_us)))
+    return modules
+
+
+def run_once(module: str, env: dict):
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", CHILD_SCRIPT, module, json.dumps(HEAVY_MODULES)],
+        cwd=BACKEND_DIR, env=env, capture_output=True, text=True, check=True,
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1]), parse_importtime(result.stderr)
+
+
+def measure(args) -> dict:
+    env = child_environment()
+    runs = [run_once(args.module, env) for _ in range(args.repeat)]
+    samples = [sample for sample, _ in runs]
+    # Los módulos más costosos de la última corrida, con la caché de bytecode ya caliente
+    _, modules = runs[-1]
+    modules.sort(key=lambda item: item[2], reverse=True)
+    return {
+        "meta": {"module": args.module, "repeat": args.repeat, "python": sys.version.split()[0]},
+        "import_seconds_median": round(statistics.median(s["import_seconds"] for s in samples), 4),
+        "import_seconds_min": round(min(s["import_seconds"] for s in samples), 4),
+        "rss_mb_median": round(statistics.median(s["rss_kb"] for s in samples) / 1024, 2),
+        "heavy_modules_loaded": samples[-1]["heavy_modules_loaded"],
+        "top_imports": [
+            {"module": name, "cumulative_ms": round(cumulative / 1000, 2), "self_ms": round(own / 1000, 2)}
+            for name, own, cumulative in modules[:args.top]
+        ],
+    }
+
+
+def compare_with_baseline(report: dict, baseline: dict, max_regression: float) -> list:
+    regressions = []
+    for key in ("import_seconds_median", "rss_mb_median"):
+        base, current = baseline.get(key), report[key]
+        if base and current > base * (1 + max_regression):
+            regressions.append(f"{key}: {base} -> {current}")
+    return regressions
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    report = measure(args)
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as fh:
+            fh.write(output + "\n")
+    print(output)
+
+    if args.baseline:
+        with open(args.baseline) as fh:
+            baseline = json.load(fh)
+        regressions = compare_with_baseline(report, baseline, args.max_regression)
+        if regressions:
+            print("Regresiones respecto a la línea base:", file=sys.stderr)
+            for line in regressions:
+                print(f"  {line}", file=sys.stderr)
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
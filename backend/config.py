@@ -14,4 +14,98 @@ SECRET_KEY = os.getenv("SECRET_KEY")
 if not SECRET_KEY:
     raise ValueError("No SECRET_KEY set")
 
-ALGORITHM = os.getenv("ALGORITHM")
\ No newline at end of file
+ALGORITHM = os.getenv("ALGORITHM")
+
+# Caché en memoria del usuario autenticado (por proceso)
+USER_CACHE_TTL_SECONDS = float(os.getenv("USER_CACHE_TTL_SECONDS", "30"))
+USER_CACHE_MAX_ENTRIES = int(os.getenv("USER_CACHE_MAX_ENTRIES", "1024"))
+
+# Hashing de contraseñas (bcrypt) fuera del event loop
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(os.cpu_count() or 4)))
+PASSWORD_HASH_MAX_PENDING = int(os.getenv("PASSWORD_HASH_MAX_PENDING", "100"))
+
+# Almacenamiento de comprobantes de pago fuera del documento del pedido
+BLOB_BACKEND = os.getenv("BLOB_BACKEND", "gridfs")  # "gridfs" o "local"
+BLOB_LOCAL_DIR = os.getenv("BLOB_LOCAL_DIR", "uploads/receipts")
+BLOB_GRIDFS_BUCKET = os.getenv("BLOB_GRIDFS_BUCKET", "receipts")
+UPLOAD_CHUNK_SIZE = int(os.getenv("UPLOAD_CHUNK_SIZE", str(256 * 1024)))
+UPLOAD_MAX_BYTES = int(os.getenv("UPLOAD_MAX_BYTES", str(10 * 1024 * 1024)))
+# Margen para los límites del multipart y los campos del formulario de /request-service
+UPLOAD_MULTIPART_OVERHEAD_BYTES = int(os.getenv("UPLOAD_MULTIPART_OVERHEAD_BYTES", str(64 * 1024)))
+
+# Paginación por cursor de los listados de pedidos
+PAGE_SIZE_DEFAULT = int(os.getenv("PAGE_SIZE_DEFAULT", "50"))
+PAGE_SIZE_MAX = int(os.getenv("PAGE_SIZE_MAX", "200"))
+
+# Índices de MongoDB
+ENSURE_INDEXES_ON_STARTUP = os.getenv("ENSURE_INDEXES_ON_STARTUP", "true").lower() == "true"
+
+# Secuencia de `order_id`: los IDs aleatorios antiguos están entre 1000 y 9999
+ORDER_ID_START = int(os.getenv("ORDER_ID_START", "10000"))
+ORDER_ID_BLOCK_SIZE = int(os.getenv("ORDER_ID_BLOCK_SIZE", "20"))
+
+# Facturas en PDF: render en un pool de procesos y caché por contenido
+INVOICE_WORKERS = int(os.getenv("INVOICE_WORKERS", "2"))
+INVOICE_CACHE_MAX_BYTES = int(os.getenv("INVOICE_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+INVOICE_EXPORT_BATCH_SIZE = int(os.getenv("INVOICE_EXPORT_BATCH_SIZE", "20"))
+INVOICE_EXPORT_MAX_ORDERS = int(os.getenv("INVOICE_EXPORT_MAX_ORDERS", "5000"))
+
+# Normalización de comprobantes en segundo plano
+RECEIPT_MAX_SIDE = int(os.getenv("RECEIPT_MAX_SIDE", "1600"))
+RECEIPT_JPEG_QUALITY = int(os.getenv("RECEIPT_JPEG_QUALITY", "80"))
+RECEIPT_THUMBNAIL_SIDE = int(os.getenv("RECEIPT_THUMBNAIL_SIDE", "200"))
+RECEIPT_KEEP_ORIGINAL = os.getenv("RECEIPT_KEEP_ORIGINAL", "false").lower() == "true"
+RECEIPT_MAX_PIXELS = int(os.getenv("RECEIPT_MAX_PIXELS", str(50_000_000)))
+
+# Actualización masiva de estados de pedidos
+BULK_STATUS_MAX_ITEMS = int(os.getenv("BULK_STATUS_MAX_ITEMS", "500"))
+BULK_STATUS_MAX_BODY_BYTES = int(os.getenv("BULK_STATUS_MAX_BODY_BYTES", str(256 * 1024)))
+
+# Pool de conexiones de MongoDB (Motor)
+MONGO_MAX_POOL_SIZE = int(os.getenv("MONGO_MAX_POOL_SIZE", "100"))
+MONGO_MIN_POOL_SIZE = int(os.getenv("MONGO_MIN_POOL_SIZE", "0"))
+MONGO_MAX_IDLE_TIME_MS = int(os.getenv("MONGO_MAX_IDLE_TIME_MS", "300000"))
+MONGO_CONNECT_TIMEOUT_MS = int(os.getenv("MONGO_CONNECT_TIMEOUT_MS", "5000"))
+MONGO_SOCKET_TIMEOUT_MS = int(os.getenv("MONGO_SOCKET_TIMEOUT_MS", "20000"))
+MONGO_SERVER_SELECTION_TIMEOUT_MS = int(os.getenv("MONGO_SERVER_SELECTION_TIMEOUT_MS", "5000"))
+MONGO_WAIT_QUEUE_TIMEOUT_MS = int(os.getenv("MONGO_WAIT_QUEUE_TIMEOUT_MS", "5000"))
+MONGO_WARM_POOL = os.getenv("MONGO_WARM_POOL", "false").lower() == "true"
+
+# Health check periódico en segundo plano
+HEALTHCHECK_INTERVAL_SECONDS = float(os.getenv("HEALTHCHECK_INTERVAL_SECONDS", "10"))
+
+# Monitoreo: comandos de MongoDB más lentos que esto se registran en el log
+SLOW_COMMAND_THRESHOLD_MS = float(os.getenv("SLOW_COMMAND_THRESHOLD_MS", "100"))
+
+# Notificaciones de pedidos por Server-Sent Events
+ORDER_CHANGE_STREAM_ENABLED = os.getenv("ORDER_CHANGE_STREAM_ENABLED", "true").lower() == "true"
+SSE_HEARTBEAT_SECONDS = float(os.getenv("SSE_HEARTBEAT_SECONDS", "15"))
+SSE_QUEUE_SIZE = int(os.getenv("SSE_QUEUE_SIZE", "100"))
+SSE_HISTORY_SIZE = int(os.getenv("SSE_HISTORY_SIZE", "1000"))
+
+# Export de pedidos en streaming
+EXPORT_BATCH_SIZE_DEFAULT = int(os.getenv("EXPORT_BATCH_SIZE_DEFAULT", "500"))
+EXPORT_BATCH_SIZE_MAX = int(os.getenv("EXPORT_BATCH_SIZE_MAX", "5000"))
+
+# Cola de trabajos en segundo plano (colección `jobs`)
+JOBS_RUN_IN_APP = os.getenv("JOBS_RUN_IN_APP", "true").lower() == "true"
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "4"))
+JOB_LEASE_SECONDS = float(os.getenv("JOB_LEASE_SECONDS", "60"))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "5"))
+JOB_RETRY_BASE_SECONDS = float(os.getenv("JOB_RETRY_BASE_SECONDS", "5"))
+JOB_RETRY_MAX_SECONDS = float(os.getenv("JOB_RETRY_MAX_SECONDS", "600"))
+JOB_POLL_SECONDS = float(os.getenv("JOB_POLL_SECONDS", "1"))
+JOB_STATS_INTERVAL_SECONDS = float(os.getenv("JOB_STATS_INTERVAL_SECONDS", "15"))
+JOB_DONE_TTL_SECONDS = int(os.getenv("JOB_DONE_TTL_SECONDS", str(7 * 24 * 3600)))
+
+# Acceso a MongoDB: plazo por operación, reintentos y circuit breaker
+DB_OPERATION_DEADLINE_MS = float(os.getenv("DB_OPERATION_DEADLINE_MS", "3000"))
+DB_RETRY_ATTEMPTS = int(os.getenv("DB_RETRY_ATTEMPTS", "2"))
+DB_RETRY_BASE_MS = float(os.getenv("DB_RETRY_BASE_MS", "50"))
+DB_CIRCUIT_FAILURE_THRESHOLD = int(os.getenv("DB_CIRCUIT_FAILURE_THRESHOLD", "5"))
+DB_CIRCUIT_RESET_SECONDS = float(os.getenv("DB_CIRCUIT_RESET_SECONDS", "10"))
+
+# Lecturas de solo consulta (listados y exports) desde secundarios; -1 desactiva maxStalenessSeconds (mínimo 90)
+READ_FROM_SECONDARIES = os.getenv("READ_FROM_SECONDARIES", "false").lower() == "true"
+MONGO_MAX_STALENESS_SECONDS = int(os.getenv("MONGO_MAX_STALENESS_SECONDS", "-1"))
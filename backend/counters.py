@@ -0,0 +1,39 @@
+import asyncio
+from pymongo import ReturnDocument
+
+
+class SequenceAllocator:
+    """Asigna números consecutivos a partir de un documento de la colección `counters`.
+
+    Cada proceso reserva bloques de `block_size` números con un único
+    `find_one_and_update` + `$inc`, y los reparte en memoria. Los números de un
+    bloque no usado se pierden al reiniciar el proceso, por lo que la
+    secuencia puede tener huecos pero nunca repite valores.
+    """
+
+    def __init__(self, collection, name: str, block_size: int = 20, start: int = 1):
+        self.collection = collection
+        self.name = name
+        self.block_size = max(block_size, 1)
+        self.start = start
+        self._next = 0
+        self._ceiling = 0
+        self._lock = asyncio.Lock()
+
+    async def _reserve_block(self):
+        counter = await self.collection.find_one_and_update(
+            {"_id": self.name},
+            {"$inc": {"seq": self.block_size}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER,
+        )
+        self._ceiling = counter["seq"]
+        self._next = self._ceiling - self.block_size
+
+    async def next(self) -> int:
+        async with self._lock:
+            if self._next >= self._ceiling:
+                await self._reserve_block()
+            value = self.start + self._next
+            self._next += 1
+            return value
@@ -1,6 +1,47 @@
+import asyncio
 from bson.objectid import ObjectId
 from datetime import datetime
 from fastapi import Request
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ReturnDocument
+from pymongo.errors import PyMongoError
+from pymongo.read_preferences import SecondaryPreferred
+from cache import TTLCache
+from resilience import db_call
+from config import (
+    MONGO_DETAILS, USER_CACHE_TTL_SECONDS, USER_CACHE_MAX_ENTRIES,
+    MONGO_MAX_POOL_SIZE, MONGO_MIN_POOL_SIZE, MONGO_MAX_IDLE_TIME_MS, MONGO_CONNECT_TIMEOUT_MS,
+    MONGO_SOCKET_TIMEOUT_MS, MONGO_SERVER_SELECTION_TIMEOUT_MS, MONGO_WAIT_QUEUE_TIMEOUT_MS,
+    READ_FROM_SECONDARIES, MONGO_MAX_STALENESS_SECONDS,
+)
+
+# Usuarios ya resueltos por email; se invalida al crear o actualizar un usuario
+user_cache = TTLCache(maxsize=USER_CACHE_MAX_ENTRIES, ttl=USER_CACHE_TTL_SECONDS)
+
+def create_mongo_client(**kwargs) -> AsyncIOMotorClient:
+    """Cliente de Motor con el pool y los timeouts configurados en config.py."""
+    options = {
+        "maxPoolSize": MONGO_MAX_POOL_SIZE,
+        "minPoolSize": MONGO_MIN_POOL_SIZE,
+        "maxIdleTimeMS": MONGO_MAX_IDLE_TIME_MS,
+        "connectTimeoutMS": MONGO_CONNECT_TIMEOUT_MS,
+        "socketTimeoutMS": MONGO_SOCKET_TIMEOUT_MS,
+        "serverSelectionTimeoutMS": MONGO_SERVER_SELECTION_TIMEOUT_MS,
+        "waitQueueTimeoutMS": MONGO_WAIT_QUEUE_TIMEOUT_MS,
+    }
+    options.update(kwargs)
+    return AsyncIOMotorClient(MONGO_DETAILS, **options)
+
+async def warm_pool(client: AsyncIOMotorClient, connections: int):
+    """Abre `connections` conexiones de antemano lanzando pings concurrentes.
+
+    Si MongoDB no responde solo se registra: la app arranca igual y /healthz informa la caída.
+    """
+    if connections > 0:
+        try:
+            await asyncio.gather(*(client.admin.command("ping") for _ in range(connections)))
+        except PyMongoError as e:
+            print(f"No se pudo precalentar el pool de MongoDB: {e}")
 
 def get_database(request: Request):
     return request.app.mongodb
@@ -9,31 +50,71 @@ def get_collection(request: Request, collection_name: str):
     db = get_database(request)
     return db[collection_name]
 
+def get_read_database(request: Request):
+    """Base de datos para consultas de solo lectura que toleran datos algo atrasados.
+
+    Con `READ_FROM_SECONDARIES` las lecturas van a un secundario si hay uno
+    disponible; si no, se usa la misma base que el resto de las rutas.
+    """
+    db = get_database(request)
+    if not READ_FROM_SECONDARIES:
+        return db
+    return db.with_options(read_preference=SecondaryPreferred(max_staleness=MONGO_MAX_STALENESS_SECONDS))
+
 async def create_user(request: Request, user_data: dict):
-    try:
-        result = await get_collection(request, "users").insert_one(user_data)
-        await request.app.mongodb_client.admin.command('ping')
-        print("Pinged your deployment!")
-        return result.inserted_id
-    except Exception as e:
-        print(f"Error inserting user: {e}")
-        return None
+    # Sin reintentos propios: un insert repetido chocaría con el índice único del email
+    result = await db_call(lambda: get_collection(request, "users").insert_one(user_data), "create_user", retries=0)
+    user_cache.invalidate(user_data.get("email"))
+    return result.inserted_id
 
 async def get_user_by_email(request: Request, email: str):
-    try:
-        user = await get_collection(request, "users").find_one({"email": email})
-        return user
-    except Exception as e:
-        print(f"Error retrieving user by email {email}: {e}")
-        return None
+    return await db_call(lambda: get_collection(request, "users").find_one({"email": email}), "get_user_by_email")
+
+async def get_cached_user_by_email(request: Request, email: str):
+    """Igual que `get_user_by_email`, pero sirve desde la caché TTL cuando es posible."""
+    user = user_cache.get(email)
+    if user is None:
+        user = await get_user_by_email(request, email)
+        if user is not None:
+            user_cache.set(email, user)
+    return user
 
 async def update_user_profile(request: Request, email: str, profile_data: dict):
-    try:
-        result = await get_collection(request, "users").update_one(
+    """Actualiza el perfil en un solo `find_one_and_update` y devuelve el documento resultante.
+
+    El bloqueo del número de ID se resuelve dentro de la misma operación: si
+    el usuario ya tiene `isIdNumberLocked`, se conserva el `idNumber` guardado;
+    si no, se guarda el nuevo y, si no está vacío, queda bloqueado.
+    """
+    locked = {"$eq": ["$isIdNumberLocked", True]}
+    fields = {key: {"$literal": value} for key, value in profile_data.items() if key not in ("idNumber", "isIdNumberLocked")}
+    if "idNumber" in profile_data:
+        id_number = profile_data["idNumber"]
+        fields["idNumber"] = {"$cond": [locked, "$idNumber", {"$literal": id_number}]}
+        fields["isIdNumberLocked"] = {"$or": [locked, bool(id_number)]}
+    # Repetir la actualización da el mismo resultado, así que puede reintentarse
+    user = await db_call(
+        lambda: get_collection(request, "users").find_one_and_update(
+            {"email": email},
+            [{"$set": fields}],
+            return_document=ReturnDocument.AFTER
+        ),
+        "update_user_profile"
+    )
+    if user is not None:
+        user_cache.set(email, user)
+    else:
+        user_cache.invalidate(email)
+    return user
+
+async def update_user_password(request: Request, email: str, hashed_password: str):
+    """Reemplaza el hash de la contraseña (p. ej. al cambiar el costo de bcrypt)."""
+    result = await db_call(
+        lambda: get_collection(request, "users").update_one(
             {"email": email},
-            {"$set": profile_data}
-        )
-        return result.modified_count > 0
-    except Exception as e:
-        print(f"Error updating user profile for {email}: {e}")
-        return False
+            {"$set": {"hashed_password": hashed_password}}
+        ),
+        "update_user_password"
+    )
+    user_cache.invalidate(email)
+    return result.modified_count > 0
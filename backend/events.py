@@ -0,0 +1,139 @@
+import asyncio
+import uuid
+from collections import deque
+import orjson
+from pymongo.errors import OperationFailure, PyMongoError
+
+# Marcador que se encola cuando un suscriptor se quedó atrás y debe recargar
+RESYNC = object()
+
+# Códigos de error de MongoDB cuando el despliegue no admite change streams
+CHANGE_STREAM_UNSUPPORTED_CODES = {40573, 40324, 303}
+
+
+class Subscription:
+    def __init__(self, predicate, queue_size: int):
+        self.predicate = predicate
+        self.queue = asyncio.Queue(maxsize=queue_size)
+
+    def offer(self, item):
+        try:
+            self.queue.put_nowait(item)
+        except asyncio.QueueFull:
+            # Cola llena: se descarta lo pendiente y se pide al cliente que recargue
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(RESYNC)
+
+
+class OrderEventBroker:
+    """Pub/sub en proceso de los cambios de pedidos.
+
+    Los eventos llevan un ID `<instancia>-<secuencia>` y se guardan los
+    últimos `history_size` para reenviarlos cuando un cliente reconecta con
+    `Last-Event-ID`. Si el ID es de otra instancia o ya salió del historial,
+    el cliente recibe un evento `resync`.
+    """
+
+    def __init__(self, history_size: int, queue_size: int):
+        self.instance_id = uuid.uuid4().hex[:8]
+        self.queue_size = queue_size
+        self.change_stream_active = False
+        self._seq = 0
+        self._history = deque(maxlen=history_size)
+        self._subscribers = set()
+
+    def __len__(self):
+        return len(self._subscribers)
+
+    def publish(self, event: dict):
+        self._seq += 1
+        event = {**event, "id": f"{self.instance_id}-{self._seq}"}
+        self._history.append((self._seq, event))
+        for subscription in list(self._subscribers):
+            if subscription.predicate(event):
+                subscription.offer(event)
+
+    def publish_local(self, event: dict):
+        """Publica desde la ruta que hizo el cambio cuando no hay change stream que lo haga."""
+        if not self.change_stream_active:
+            self.publish(event)
+
+    def subscribe(self, predicate, last_event_id: str = None) -> Subscription:
+        subscription = Subscription(predicate, self.queue_size)
+        if last_event_id:
+            instance_id, _, seq = last_event_id.partition("-")
+            oldest = self._history[0][0] if self._history else self._seq + 1
+            if instance_id != self.instance_id or not seq.isdigit() or int(seq) + 1 < oldest:
+                subscription.offer(RESYNC)
+            else:
+                for event_seq, event in self._history:
+                    if event_seq > int(seq) and predicate(event):
+                        subscription.offer(event)
+        self._subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        self._subscribers.discard(subscription)
+
+
+def order_event(event_type: str, order: dict) -> dict:
+    return {
+        "type": event_type,
+        "order_id": order.get("order_id"),
+        "user_id": order.get("user_id"),
+        "serviceType": order.get("serviceType"),
+        "status": order.get("status"),
+    }
+
+
+def format_sse(event) -> bytes:
+    if event is RESYNC:
+        return b"event: resync\ndata: {}\n\n"
+    payload = orjson.dumps({k: v for k, v in event.items() if k != "id"})
+    return f"id: {event['id']}\nevent: {event['type']}\n".encode() + b"data: " + payload + b"\n\n"
+
+
+async def watch_order_changes(db, broker: OrderEventBroker, retry_seconds: float = 5.0):
+    """Alimenta el broker con el change stream de `orders`.
+
+    Si el despliegue no admite change streams (p. ej. un mongod sin réplica),
+    deja `change_stream_active` en falso y las rutas publican directamente.
+    """
+    pipeline = [
+        {"$match": {"$or": [
+            {"operationType": "insert"},
+            {"operationType": "update", "updateDescription.updatedFields.status": {"$exists": True}},
+        ]}},
+        # Solo los campos del evento; nunca los bytes ni referencias del comprobante
+        {"$project": {"operationType": 1, "fullDocument.order_id": 1, "fullDocument.user_id": 1,
+                      "fullDocument.serviceType": 1, "fullDocument.status": 1}},
+    ]
+    resume_token = None
+    while True:
+        try:
+            async with db["orders"].watch(pipeline, full_document="updateLookup", resume_after=resume_token) as stream:
+                broker.change_stream_active = True
+                async for change in stream:
+                    resume_token = stream.resume_token
+                    order = change.get("fullDocument") or {}
+                    event_type = "order_created" if change["operationType"] == "insert" else "order_status_changed"
+                    broker.publish(order_event(event_type, order))
+        except asyncio.CancelledError:
+            raise
+        except NotImplementedError:
+            broker.change_stream_active = False
+            print("Change streams no disponibles; se usa pub/sub en proceso")
+            return
+        except OperationFailure as e:
+            broker.change_stream_active = False
+            if e.code in CHANGE_STREAM_UNSUPPORTED_CODES:
+                print(f"Change streams no disponibles ({e.code}); se usa pub/sub en proceso")
+                return
+            print(f"Error en el change stream de pedidos: {e}")
+            if e.code == 286:  # ChangeStreamHistoryLost: el token ya no existe en el oplog
+                resume_token = None
+        except PyMongoError as e:
+            broker.change_stream_active = False
+            print(f"Error en el change stream de pedidos: {e}")
+        await asyncio.sleep(retry_seconds)
@@ -0,0 +1,67 @@
+import csv
+import io
+import orjson
+from bson import ObjectId
+from pymongo import ASCENDING
+
+# Campos exportados; la proyección deja fuera el comprobante y la miniatura
+EXPORT_FIELDS = ["order_id", "user_id", "client_name", "serviceType", "amount", "transfer_id", "status", "created_at"]
+
+
+async def _batches(db, query: dict, batch_size: int):
+    cursor = (
+        db["orders"]
+        .find(query, {field: 1 for field in EXPORT_FIELDS})
+        .sort([("created_at", ASCENDING), ("_id", ASCENDING)])
+        .batch_size(batch_size)
+    )
+    batch = []
+    async for order in cursor:
+        batch.append(order)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+async def _rows(db, query: dict, batch_size: int, include_client: bool):
+    """Filas del export por lotes; con `include_client` se unen los datos de `users` con un `$in` por lote."""
+    async for batch in _batches(db, query, batch_size):
+        clients = {}
+        if include_client:
+            user_ids = [ObjectId(o["user_id"]) for o in batch if ObjectId.is_valid(o.get("user_id", ""))]
+            async for client in db["users"].find({"_id": {"$in": user_ids}}, {"name": 1, "idNumber": 1}):
+                clients[str(client["_id"])] = client
+        rows = []
+        for order in batch:
+            row = {field: order.get(field) for field in EXPORT_FIELDS}
+            if include_client:
+                client = clients.get(order.get("user_id"), {})
+                row["client_name"] = client.get("name", row["client_name"])
+                row["idNumber"] = client.get("idNumber")
+            rows.append(row)
+        yield rows
+
+
+async def stream_orders_csv(db, query: dict, batch_size: int, include_client: bool = False):
+    columns = EXPORT_FIELDS + (["idNumber"] if include_client else [])
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=columns, extrasaction="ignore")
+    writer.writeheader()
+    async for rows in _rows(db, query, batch_size, include_client):
+        for row in rows:
+            if row.get("created_at") is not None:
+                row["created_at"] = row["created_at"].isoformat()
+            writer.writerow(row)
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+
+async def stream_orders_ndjson(db, query: dict, batch_size: int, include_client: bool = False):
+    # `created_at` sale en ISO sin zona, igual que en el CSV y en el resto de la API
+    async for rows in _rows(db, query, batch_size, include_client):
+        yield b"".join(orjson.dumps(row) + b"\n" for row in rows)
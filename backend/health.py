@@ -0,0 +1,40 @@
+import asyncio
+import time
+from datetime import datetime
+
+
+class DatabaseHealth:
+    """Guarda el resultado de un `ping` periódico para que ninguna petición pague por él."""
+
+    def __init__(self, client, interval: float):
+        self.client = client
+        self.interval = interval
+        self.status = {"ok": False, "checked_at": None, "latency_ms": None, "error": None}
+
+    async def check(self):
+        started = time.perf_counter()
+        try:
+            await self.client.admin.command("ping")
+            self.status = {
+                "ok": True,
+                "checked_at": datetime.utcnow(),
+                "latency_ms": round((time.perf_counter() - started) * 1000, 2),
+                "error": None,
+            }
+        except Exception as e:
+            # /healthz es público: el detalle (hosts y topología del clúster) solo va al log
+            if self.status["ok"] or self.status["checked_at"] is None:
+                print(f"MongoDB no responde al ping: {e}")
+            self.status = {"ok": False, "checked_at": datetime.utcnow(), "latency_ms": None, "error": type(e).__name__}
+
+    async def run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            await self.check()
+
+    def is_healthy(self) -> bool:
+        checked_at = self.status["checked_at"]
+        if not self.status["ok"] or checked_at is None:
+            return False
+        # Un resultado demasiado viejo indica que el ciclo de chequeo se detuvo
+        return (datetime.utcnow() - checked_at).total_seconds() < self.interval * 3
@@ -0,0 +1,118 @@
+from datetime import datetime
+from bson import ObjectId
+from pymongo.errors import ConnectionFailure, PyMongoError
+from models.user_models import USER_INDEXES
+from models.order_models import ORDER_INDEXES, ORDER_ROLLUP_INDEXES
+from pagination import KEYSET_SORT
+from jobs import JOB_INDEXES
+
+# Índices declarados por colección; se aplican al arrancar o con `manage.py ensure-indexes`
+INDEX_REGISTRY = {
+    "users": USER_INDEXES,
+    "orders": ORDER_INDEXES,
+    "order_rollups": ORDER_ROLLUP_INDEXES,
+    "jobs": JOB_INDEXES,
+}
+
+# Consultas representativas de cada ruta: (nombre, colección, filtro, orden)
+ROUTE_QUERIES = [
+    ("get_user_by_email", "users", {"email": "explain@example.com"}, None),
+    ("find_order_by_order_id", "orders", {"order_id": "1000"}, None),
+    ("my_requests", "orders", {"user_id": "000000000000000000000000"}, KEYSET_SORT),
+    ("my_requests_after_cursor", "orders", {"$and": [
+        {"user_id": "000000000000000000000000"},
+        {"$or": [{"created_at": {"$lt": datetime(2024, 1, 1)}}, {"created_at": datetime(2024, 1, 1), "_id": {"$lt": ObjectId("0" * 24)}}]},
+    ]}, KEYSET_SORT),
+    ("all_orders", "orders", {}, KEYSET_SORT),
+    ("orders_by_status", "orders", {"status": "Aprobado"}, KEYSET_SORT),
+    ("orders_by_service_type", "orders", {"serviceType": "SEO"}, KEYSET_SORT),
+    ("orders_by_status_and_service_type", "orders", {"status": "Aprobado", "serviceType": "SEO"}, KEYSET_SORT),
+    ("orders_by_date_range", "orders", {"created_at": {"$gte": datetime(2024, 1, 1), "$lt": datetime(2024, 2, 1)}}, KEYSET_SORT),
+    ("orders_by_transfer_id", "orders", {"transfer_id": "T1"}, KEYSET_SORT),
+    ("orders_by_client_name_prefix", "orders", {"client_name": {"$regex": "^Ana"}}, KEYSET_SORT),
+    ("orders_by_client_name_text", "orders", {"$text": {"$search": "Ana"}}, KEYSET_SORT),
+    ("admin_stats", "order_rollups", {"day": {"$gte": "2024-01-01"}}, [("day", 1)]),
+    ("claim_job", "jobs", {
+        "status": {"$in": ["queued", "running"]}, "run_at": {"$lte": datetime(2024, 1, 1)},
+        "$expr": {"$lt": ["$attempts", "$max_attempts"]},
+    }, [("run_at", 1)]),
+]
+
+
+async def ensure_indexes(db) -> dict:
+    """Crea los índices del registro; es idempotente.
+
+    Devuelve por colección los nombres creados o el error si no se pudieron
+    crear (p. ej. emails duplicados que impiden el índice único, o MongoDB
+    caído). Nunca lanza: la app debe arrancar igual y /healthz informar la caída.
+    """
+    results = {}
+    for collection_name, indexes in INDEX_REGISTRY.items():
+        try:
+            results[collection_name] = await db[collection_name].create_indexes(indexes)
+        except ConnectionFailure as e:
+            # Sin conexión las demás colecciones fallarían igual tras esperar el mismo timeout
+            print(f"Error creating indexes: MongoDB no disponible: {e}")
+            for name in INDEX_REGISTRY:
+                results.setdefault(name, e)
+            break
+        except PyMongoError as e:
+            print(f"Error creating indexes on {collection_name}: {e}")
+            results[collection_name] = e
+    return results
+
+
+def _comparable_key(index: dict) -> dict:
+    """Clave de un índice lista para comparar.
+
+    MongoDB guarda los índices de texto como `{"_fts": "text", "_ftsx": 1}` con
+    los campos en `weights`, así que esos se comparan por campos y pesos.
+    """
+    key = dict(index["key"])
+    if "_fts" not in key and "text" not in key.values():
+        return key
+    fields = {name: order for name, order in key.items() if order != "text" and name not in ("_fts", "_ftsx")}
+    weights = index.get("weights") or {name: 1 for name, order in key.items() if order == "text"}
+    return {**fields, "$text": dict(weights)}
+
+
+async def verify_indexes(db) -> list:
+    """Lista los índices declarados que no existen (o difieren) en la base de datos."""
+    missing = []
+    for collection_name, indexes in INDEX_REGISTRY.items():
+        existing = {}
+        async for info in db[collection_name].list_indexes():
+            existing[info["name"]] = info
+        for index in indexes:
+            spec = index.document
+            current = existing.get(spec["name"])
+            if (current is None
+                    or _comparable_key(current) != _comparable_key(spec)
+                    or bool(current.get("unique")) != bool(spec.get("unique"))):
+                missing.append(f"{collection_name}.{spec['name']}")
+    return missing
+
+
+def _plan_stages(plan):
+    if isinstance(plan, dict):
+        if "stage" in plan:
+            yield plan["stage"]
+        for value in plan.values():
+            yield from _plan_stages(value)
+    elif isinstance(plan, list):
+        for item in plan:
+            yield from _plan_stages(item)
+
+
+async def find_collscans(db, queries=ROUTE_QUERIES) -> list:
+    """Ejecuta `explain()` sobre las consultas de las rutas y devuelve las que hacen COLLSCAN."""
+    offenders = []
+    for name, collection_name, query, sort in queries:
+        cursor = db[collection_name].find(query)
+        if sort:
+            cursor = cursor.sort(sort)
+        plan = await cursor.explain()
+        winning_plan = plan.get("queryPlanner", {}).get("winningPlan", {})
+        if "COLLSCAN" in set(_plan_stages(winning_plan)):
+            offenders.append(name)
+    return offenders
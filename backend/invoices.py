@@ -0,0 +1,154 @@
+import asyncio
+import hashlib
+import json
+import multiprocessing
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from cache import SizedLRUCache
+from config import INVOICE_WORKERS, INVOICE_CACHE_MAX_BYTES
+
+# PDFs ya generados, indexados por el hash de los datos que contienen
+invoice_cache = SizedLRUCache(max_bytes=INVOICE_CACHE_MAX_BYTES)
+
+_executor = None
+_in_flight = {}
+
+CLIENT_FIELDS = ("name", "idType", "idNumber", "phone", "address")
+
+
+def invoice_fields(order: dict, client: dict) -> dict:
+    """Extrae del pedido y del cliente solo los datos que aparecen en la factura."""
+    return {
+        "client": {field: client[field] for field in CLIENT_FIELDS if field in client},
+        "order": {
+            "order_id": order["order_id"],
+            "serviceType": order["serviceType"],
+            "transfer_id": order["transfer_id"],
+            "created_at": order["created_at"].strftime("%d-%m-%Y"),
+        },
+    }
+
+
+def invoice_cache_key(fields: dict) -> str:
+    return hashlib.sha256(json.dumps(fields, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def render_invoice_pdf(fields: dict) -> bytes:
+    """Genera el PDF de la factura. Es síncrono y se ejecuta en el pool de procesos."""
+    client = fields["client"]
+    order = fields["order"]
+
+    # fpdf solo se carga en el proceso que renderiza la primera factura
+    from fpdf import FPDF
+    pdf = FPDF()
+    pdf.set_auto_page_break(auto=True, margin=15)
+    pdf.add_page()
+    pdf.set_font("Arial", size=12)
+
+    pdf.cell(200, 10, "Detalles del Pedido", ln=True, align="C")
+    pdf.ln(10)  # Espacio
+
+    # 📌 Información del Cliente
+    pdf.set_font("Arial", style='B', size=12)  # ✅ Texto en negrita
+    pdf.cell(50, 10, "Información del Cliente:", ln=True)
+    pdf.set_font("Arial", size=12)  # ✅ Volver a texto normal
+    pdf.cell(50, 10, f"Nombre: {client.get('name', 'Sin Nombre')}", ln=True)
+    pdf.cell(50, 10, f"Tipo de ID: {client.get('idType', 'N/A')} {client.get('idNumber', 'N/A')}", ln=True)
+    pdf.cell(50, 10, f"Teléfono: {client.get('phone', 'No disponible')}", ln=True)
+    pdf.cell(50, 10, f"Dirección: {client.get('address', 'No disponible')}", ln=True)
+    pdf.ln(10)  # Espacio
+
+    # 📌 Información del Pedido
+    pdf.set_font("Arial", style='B', size=12)
+    pdf.cell(50, 10, "Información del Pedido:", ln=True)
+    pdf.set_font("Arial", size=12)
+    pdf.cell(50, 10, f"ID del Pedido: {order['order_id']}", ln=True)
+    pdf.cell(50, 10, f"Tipo de Servicio: {order['serviceType']}", ln=True)
+    pdf.cell(50, 10, f"ID de Transferencia: {order['transfer_id']}", ln=True)
+    pdf.cell(50, 10, f"Fecha del Pedido: {order['created_at']}", ln=True)
+
+    return pdf.output(dest="S").encode("latin-1")
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        # INVOICE_WORKERS=0 renderiza en hilos (útil donde no se pueden crear procesos)
+        if INVOICE_WORKERS > 0:
+            # Sin `fork`: este proceso ya tiene hilos de Motor y de bcrypt, y un hijo
+            # creado con fork puede quedar bloqueado en un lock que heredó tomado
+            methods = multiprocessing.get_all_start_methods()
+            context = multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+            _executor = ProcessPoolExecutor(max_workers=INVOICE_WORKERS, mp_context=context)
+        else:
+            _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="invoice")
+    return _executor
+
+
+def shutdown_executor():
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+
+async def get_invoice_pdf(order: dict, client: dict) -> bytes:
+    """Devuelve el PDF desde la caché o lo renderiza fuera del event loop.
+
+    Si ya hay un render en curso para los mismos datos se espera ese mismo
+    resultado en lugar de lanzar otro.
+    """
+    fields = invoice_fields(order, client)
+    key = invoice_cache_key(fields)
+    pdf_bytes = invoice_cache.get(key)
+    if pdf_bytes is not None:
+        return pdf_bytes
+
+    future = _in_flight.get(key)
+    if future is None:
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(_get_executor(), render_invoice_pdf, fields)
+        _in_flight[key] = future
+        future.add_done_callback(lambda done: _finish_render(key, done))
+    return await asyncio.shield(future)
+
+
+def _finish_render(key: str, future):
+    _in_flight.pop(key, None)
+    if not future.cancelled() and future.exception() is None:
+        invoice_cache.set(key, future.result())
+
+
+class _ZipStream:
+    """Destino de escritura para `ZipFile` que acumula bytes hasta que se vacía."""
+
+    def __init__(self):
+        self._parts = []
+
+    def write(self, data) -> int:
+        self._parts.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self._parts)
+        self._parts.clear()
+        return data
+
+
+async def stream_invoice_zip(batches):
+    """Genera un ZIP por partes a partir de lotes de pares `(pedido, cliente)`.
+
+    Cada lote se renderiza en paralelo y se emite antes de pedir el siguiente,
+    de modo que la memoria queda acotada por el tamaño del lote.
+    """
+    buffer = _ZipStream()
+    with zipfile.ZipFile(buffer, mode="w", compression=zipfile.ZIP_STORED) as archive:
+        async for batch in batches:
+            pdfs = await asyncio.gather(*(get_invoice_pdf(order, client) for order, client in batch))
+            for (order, _), pdf_bytes in zip(batch, pdfs):
+                archive.writestr(f"{order['order_id']}.pdf", pdf_bytes)
+            yield buffer.drain()
+    yield buffer.drain()
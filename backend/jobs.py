@@ -0,0 +1,262 @@
+import asyncio
+import random
+import socket
+import time
+import uuid
+from datetime import datetime, timedelta
+from pymongo import ASCENDING, IndexModel, ReturnDocument
+from config import (
+    JOB_WORKERS, JOB_LEASE_SECONDS, JOB_MAX_ATTEMPTS, JOB_RETRY_BASE_SECONDS, JOB_RETRY_MAX_SECONDS,
+    JOB_POLL_SECONDS, JOB_STATS_INTERVAL_SECONDS, JOB_DONE_TTL_SECONDS,
+)
+from metrics import Counter, Histogram
+from receipts import process_receipt
+
+# Estados de un trabajo: queued -> running -> done | (queued para reintentar) | dead
+JOB_STATUSES = ("queued", "running", "done", "dead")
+
+# `run_at` es el momento a partir del cual el trabajo puede tomarse. Mientras
+# está en `running` guarda el vencimiento del lease, así que una sola consulta
+# encuentra tanto los pendientes como los que quedaron huérfanos.
+JOB_INDEXES = [
+    IndexModel([("status", ASCENDING), ("run_at", ASCENDING)], name="status_run_at"),
+    IndexModel(
+        [("finished_at", ASCENDING)], name="finished_at_ttl",
+        expireAfterSeconds=JOB_DONE_TTL_SECONDS, partialFilterExpression={"status": "done"}
+    ),
+]
+
+# Trabajos conocidos: tipo -> corrutina `(db, store, payload)`
+JOB_HANDLERS = {
+    "process_receipt": lambda db, store, payload: process_receipt(db, store, payload["order_id"]),
+}
+
+job_duration = Histogram("job_duration_seconds", "Duración de los trabajos en segundo plano", ("type", "outcome"))
+job_queue_latency = Histogram(
+    "job_queue_latency_seconds", "Espera entre que un trabajo puede ejecutarse y un worker lo toma", ("type",)
+)
+jobs_processed = Counter("jobs_processed_total", "Trabajos terminados por tipo y resultado", ("type", "outcome"))
+
+
+def retry_delay(attempts: int, base: float = JOB_RETRY_BASE_SECONDS, cap: float = JOB_RETRY_MAX_SECONDS) -> float:
+    """Backoff exponencial con jitter completo."""
+    return random.uniform(0, min(cap, base * 2 ** (attempts - 1)))
+
+
+class JobQueue:
+    """Cola de trabajos persistente sobre la colección `jobs`."""
+
+    def __init__(self, collection, lease_seconds: float = JOB_LEASE_SECONDS, max_attempts: int = JOB_MAX_ATTEMPTS):
+        self.collection = collection
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.depth = {status: 0 for status in JOB_STATUSES}
+        self._wakeup = asyncio.Event()
+
+    async def enqueue(self, job_type: str, payload: dict, delay_seconds: float = 0) -> str:
+        if job_type not in JOB_HANDLERS:
+            raise ValueError(f"Tipo de trabajo desconocido: {job_type}")
+        now = datetime.utcnow()
+        job = {
+            "type": job_type,
+            "payload": payload,
+            "status": "queued",
+            "attempts": 0,
+            "max_attempts": self.max_attempts,
+            "created_at": now,
+            "run_at": now + timedelta(seconds=delay_seconds),
+        }
+        result = await self.collection.insert_one(job)
+        # Despierta a los workers de este proceso sin esperar al siguiente sondeo
+        self._wakeup.set()
+        return str(result.inserted_id)
+
+    async def claim(self, worker_id: str):
+        """Toma el trabajo vencido más antiguo y le asigna un lease."""
+        now = datetime.utcnow()
+        changes = {"status": "running", "worker_id": worker_id, "started_at": now,
+                   "run_at": now + timedelta(seconds=self.lease_seconds)}
+        # Se pide el documento anterior para conocer desde cuándo estaba disponible
+        # Un lease vencido con los intentos agotados no se retoma: lo cierra `sweep_exhausted`
+        job = await self.collection.find_one_and_update(
+            {
+                "status": {"$in": ["queued", "running"]},
+                "run_at": {"$lte": now},
+                "$expr": {"$lt": ["$attempts", "$max_attempts"]},
+            },
+            {"$set": changes, "$inc": {"attempts": 1}},
+            sort=[("run_at", ASCENDING)],
+            return_document=ReturnDocument.BEFORE,
+        )
+        if job is None:
+            return None
+        job["available_at"] = job["run_at"]
+        job["attempts"] = job.get("attempts", 0) + 1
+        job.update(changes)
+        return job
+
+    async def extend_lease(self, job: dict) -> bool:
+        result = await self.collection.update_one(
+            {"_id": job["_id"], "status": "running", "worker_id": job["worker_id"]},
+            {"$set": {"run_at": datetime.utcnow() + timedelta(seconds=self.lease_seconds)}}
+        )
+        return result.modified_count > 0
+
+    async def complete(self, job: dict):
+        await self.collection.update_one(
+            {"_id": job["_id"], "status": "running", "worker_id": job["worker_id"]},
+            {"$set": {"status": "done", "finished_at": datetime.utcnow()}, "$unset": {"worker_id": ""}}
+        )
+
+    async def fail(self, job: dict, error: str) -> str:
+        """Reprograma el trabajo con backoff o lo deja en `dead` si agotó los intentos."""
+        now = datetime.utcnow()
+        if job["attempts"] >= job.get("max_attempts", self.max_attempts):
+            update = {"status": "dead", "finished_at": now, "last_error": error}
+        else:
+            update = {"status": "queued", "run_at": now + timedelta(seconds=retry_delay(job["attempts"])), "last_error": error}
+        await self.collection.update_one(
+            {"_id": job["_id"], "status": "running", "worker_id": job["worker_id"]},
+            {"$set": update, "$unset": {"worker_id": ""}}
+        )
+        return update["status"]
+
+    async def sweep_exhausted(self) -> int:
+        """Pasa a `dead` los trabajos cuyo worker murió o se colgó en el último intento.
+
+        Esos trabajos nunca llegan a `fail()` (p. ej. el proceso se quedó sin
+        memoria), así que sin este barrido quedarían en `running` para siempre.
+        """
+        now = datetime.utcnow()
+        result = await self.collection.update_many(
+            {
+                "status": "running",
+                "run_at": {"$lte": now},
+                "$expr": {"$gte": ["$attempts", "$max_attempts"]},
+            },
+            {
+                "$set": {"status": "dead", "finished_at": now, "last_error": "Lease vencido en el último intento"},
+                "$unset": {"worker_id": ""},
+            }
+        )
+        return result.modified_count
+
+    async def requeue_dead(self, job_type: str = None) -> int:
+        """Vuelve a encolar los trabajos en `dead` con los intentos en cero."""
+        query = {"status": "dead"}
+        if job_type:
+            query["type"] = job_type
+        result = await self.collection.update_many(
+            query,
+            {"$set": {"status": "queued", "attempts": 0, "run_at": datetime.utcnow()}, "$unset": {"finished_at": ""}}
+        )
+        return result.modified_count
+
+    async def refresh_depth(self) -> dict:
+        depth = {status: 0 for status in JOB_STATUSES}
+        async for row in self.collection.aggregate([{"$group": {"_id": "$status", "count": {"$sum": 1}}}]):
+            depth[row["_id"]] = row["count"]
+        self.depth = depth
+        return depth
+
+    async def run_stats(self, interval: float = JOB_STATS_INTERVAL_SECONDS):
+        """Actualiza periódicamente el tamaño de la cola para /metrics."""
+        while True:
+            try:
+                await self.refresh_depth()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Error al contar los trabajos de la cola: {e}")
+            await asyncio.sleep(interval)
+
+    async def wait_for_work(self, timeout: float):
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        self._wakeup.clear()
+
+
+class JobWorker:
+    """Pool de workers asíncronos que consumen la cola.
+
+    Puede correr dentro de la app (`JOBS_RUN_IN_APP`) o en un proceso aparte
+    con `python manage.py worker`; varios procesos pueden compartir la cola.
+    """
+
+    def __init__(self, queue: JobQueue, db, store, concurrency: int = JOB_WORKERS, poll_seconds: float = JOB_POLL_SECONDS):
+        self.queue = queue
+        self.db = db
+        self.store = store
+        self.concurrency = concurrency
+        self.poll_seconds = poll_seconds
+        self.worker_id = f"{socket.gethostname()}-{uuid.uuid4().hex[:8]}"
+
+    async def run(self):
+        await asyncio.gather(self._sweep_loop(), *(self._loop(i) for i in range(self.concurrency)))
+
+    async def _sweep_loop(self):
+        while True:
+            try:
+                swept = await self.queue.sweep_exhausted()
+                if swept:
+                    print(f"Trabajos pasados a dead por lease vencido: {swept}")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Error al barrer los trabajos con lease vencido: {e}")
+            await asyncio.sleep(self.queue.lease_seconds)
+
+    async def _loop(self, index: int):
+        worker_id = f"{self.worker_id}-{index}"
+        while True:
+            try:
+                job = await self.queue.claim(worker_id)
+                if job is None:
+                    await self.queue.wait_for_work(self.poll_seconds)
+                    continue
+                await self.execute(job)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # Un error de la cola (p. ej. Mongo caído) no debe detener al worker;
+                # si no se pudo cerrar el trabajo, su lease vence y se retoma
+                print(f"Error en el worker {worker_id} de la cola: {e}")
+                await asyncio.sleep(self.poll_seconds)
+
+    async def _keep_lease(self, job: dict):
+        while True:
+            await asyncio.sleep(self.queue.lease_seconds / 3)
+            try:
+                if not await self.queue.extend_lease(job):
+                    return
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Error al renovar el lease del trabajo {job['_id']}: {e}")
+
+    async def execute(self, job: dict):
+        job_type = job["type"]
+        waited = (job["started_at"] - job["available_at"]).total_seconds()
+        job_queue_latency.observe(max(0.0, waited), job_type)
+        started = time.perf_counter()
+        keeper = asyncio.create_task(self._keep_lease(job))
+        try:
+            handler = JOB_HANDLERS.get(job_type)
+            if handler is None:
+                raise ValueError(f"Tipo de trabajo desconocido: {job_type}")
+            await handler(self.db, self.store, job["payload"])
+        except asyncio.CancelledError:
+            # Al apagar, el lease vence y otro worker lo retoma
+            raise
+        except Exception as e:
+            outcome = await self.queue.fail(job, f"{type(e).__name__}: {e}")
+            print(f"Error en el trabajo {job_type} {job['_id']} (intento {job['attempts']}): {e}")
+        else:
+            outcome = "done"
+            await self.queue.complete(job)
+        finally:
+            keeper.cancel()
+        job_duration.observe(time.perf_counter() - started, job_type, outcome)
+        jobs_processed.inc(job_type, outcome)
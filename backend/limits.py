@@ -0,0 +1,48 @@
+from fastapi import HTTPException
+from starlette.responses import JSONResponse
+
+TOO_LARGE_DETAIL = "El cuerpo de la petición supera el tamaño máximo permitido"
+
+
+class BodySizeLimitMiddleware:
+    """Middleware ASGI que limita el tamaño del cuerpo por ruta, antes de que se lea.
+
+    `limits` es `{(método, ruta): bytes}`. Se rechaza con 413 por
+    `Content-Length` sin leer nada y, si no viene (chunked), en cuanto lo
+    recibido supera el límite.
+    """
+
+    def __init__(self, app, limits: dict):
+        self.app = app
+        self.limits = limits
+
+    async def __call__(self, scope, receive, send):
+        limit = self.limits.get((scope.get("method"), scope.get("path"))) if scope["type"] == "http" else None
+        if limit is None:
+            await self.app(scope, receive, send)
+            return
+
+        content_length = dict(scope["headers"]).get(b"content-length")
+        if content_length is not None:
+            try:
+                declared = int(content_length)
+            except ValueError:
+                await JSONResponse({"detail": "Content-Length inválido"}, status_code=400)(scope, receive, send)
+                return
+            if declared > limit:
+                await JSONResponse({"detail": TOO_LARGE_DETAIL}, status_code=413)(scope, receive, send)
+                return
+
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    # FastAPI deja pasar las HTTPException que surgen al leer el cuerpo
+                    raise HTTPException(status_code=413, detail=TOO_LARGE_DETAIL)
+            return message
+
+        await self.app(scope, limited_receive, send)
@@ -1,10 +1,74 @@
+import asyncio
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from auth import router as auth_router
-from motor.motor_asyncio import AsyncIOMotorClient
-from config import MONGO_DETAILS, DATABASE_NAME
+from fastapi.responses import JSONResponse, ORJSONResponse, PlainTextResponse
+from routers import auth, users, orders, admin
+from config import (
+    DATABASE_NAME, ENSURE_INDEXES_ON_STARTUP, ORDER_ID_START, ORDER_ID_BLOCK_SIZE,
+    MONGO_WARM_POOL, MONGO_MIN_POOL_SIZE, HEALTHCHECK_INTERVAL_SECONDS,
+    ORDER_CHANGE_STREAM_ENABLED, SSE_HISTORY_SIZE, SSE_QUEUE_SIZE, JOBS_RUN_IN_APP, BULK_STATUS_MAX_BODY_BYTES,
+    UPLOAD_MAX_BYTES, UPLOAD_MULTIPART_OVERHEAD_BYTES,
+)
+from database import create_mongo_client, warm_pool
+from storage import create_blob_store
+from indexes import ensure_indexes
+from counters import SequenceAllocator
+from health import DatabaseHealth
+from events import OrderEventBroker, watch_order_changes
+from jobs import JobQueue, JobWorker
+from invoices import shutdown_executor as shutdown_invoice_executor, invoice_cache
+from limits import BodySizeLimitMiddleware
+from metrics import MetricsMiddleware, CommandMetricsListener, register_gauges, render_metrics
+from utils import password_pool_stats
+from database import user_cache
+from resilience import db_breaker
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    app.mongodb_client = create_mongo_client(event_listeners=[CommandMetricsListener()])
+    app.mongodb = app.mongodb_client[DATABASE_NAME]
+    app.blob_store = create_blob_store(app.mongodb)
+    app.order_id_allocator = SequenceAllocator(
+        app.mongodb["counters"], "order_id", block_size=ORDER_ID_BLOCK_SIZE, start=ORDER_ID_START
+    )
+    if MONGO_WARM_POOL:
+        await warm_pool(app.mongodb_client, MONGO_MIN_POOL_SIZE)
+    if ENSURE_INDEXES_ON_STARTUP:
+        await ensure_indexes(app.mongodb)
+
+    # Ping periódico en segundo plano; /healthz solo lee el último resultado
+    app.db_health = DatabaseHealth(app.mongodb_client, HEALTHCHECK_INTERVAL_SECONDS)
+    await app.db_health.check()
+    health_task = asyncio.create_task(app.db_health.run())
+
+    # Eventos de pedidos para SSE: change stream si está disponible, si no pub/sub en proceso
+    app.order_events = OrderEventBroker(history_size=SSE_HISTORY_SIZE, queue_size=SSE_QUEUE_SIZE)
+    background_tasks = [health_task]
+    if ORDER_CHANGE_STREAM_ENABLED:
+        background_tasks.append(asyncio.create_task(watch_order_changes(app.mongodb, app.order_events)))
+
+    # Cola de trabajos: los workers corren aquí o en `python manage.py worker`
+    app.job_queue = JobQueue(app.mongodb["jobs"])
+    background_tasks.append(asyncio.create_task(app.job_queue.run_stats()))
+    if JOBS_RUN_IN_APP:
+        worker = JobWorker(app.job_queue, app.mongodb, app.blob_store)
+        background_tasks.append(asyncio.create_task(worker.run()))
+    print("Connected to MongoDB")
+
+    yield
+
+    for task in background_tasks:
+        task.cancel()
+    # Esperar a que terminen antes de cerrar el cliente que todavía pueden estar usando
+    await asyncio.gather(*background_tasks, return_exceptions=True)
+    app.mongodb_client.close()
+    shutdown_invoice_executor()
+    print("Closed connection to MongoDB")
 
-app = FastAPI()
+
+app = FastAPI(lifespan=lifespan, default_response_class=ORJSONResponse)
 
 allowed_origins = [
     "https://marketing-crm-eight.vercel.app",
@@ -18,18 +82,59 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-app.include_router(auth_router)
-@app.on_event("startup")
-async def startup_db_client():
-    app.mongodb_client = AsyncIOMotorClient(MONGO_DETAILS)
-    app.mongodb = app.mongodb_client[DATABASE_NAME]
-    print("Connected to MongoDB")
+# Límites de tamaño del cuerpo que se aplican antes de leerlo (Starlette guarda
+# el multipart completo en disco antes de llamar a la ruta)
+app.add_middleware(BodySizeLimitMiddleware, limits={
+    ("PUT", "/orders/bulk-update-status"): BULK_STATUS_MAX_BODY_BYTES,
+    ("POST", "/request-service"): UPLOAD_MAX_BYTES + UPLOAD_MULTIPART_OVERHEAD_BYTES,
+})
 
-@app.on_event("shutdown")
-async def shutdown_db_client():
-    app.mongodb_client.close()
-    print("Closed connection to MongoDB")
+app.add_middleware(MetricsMiddleware)
+
+app.include_router(auth.router)
+app.include_router(users.router)
+app.include_router(orders.router)
+app.include_router(admin.router)
+
+
+def _process_gauges():
+    gauges = [
+        ("password_hash_waiting", "Cálculos de bcrypt esperando turno", {}, password_pool_stats["waiting"]),
+        ("password_hash_in_flight", "Cálculos de bcrypt en ejecución", {}, password_pool_stats["in_flight"]),
+        ("password_hash_rejected_total", "Cálculos de bcrypt rechazados por cola llena", {}, password_pool_stats["rejected"]),
+        ("user_cache_entries", "Usuarios en la caché de autenticación", {}, len(user_cache)),
+        ("invoice_cache_bytes", "Bytes ocupados por la caché de facturas", {}, invoice_cache.current_bytes),
+        ("mongodb_circuit_open", "1 si el circuit breaker de MongoDB está abierto", {}, int(db_breaker.is_open)),
+    ]
+    order_events = getattr(app, "order_events", None)
+    if order_events is not None:
+        gauges.append(("sse_order_subscribers", "Conexiones SSE de pedidos abiertas", {}, len(order_events)))
+    job_queue = getattr(app, "job_queue", None)
+    if job_queue is not None:
+        for job_status, count in job_queue.depth.items():
+            gauges.append(("job_queue_depth", "Trabajos en la colección jobs por estado", {"status": job_status}, count))
+    db_health = getattr(app, "db_health", None)
+    if db_health is not None:
+        gauges.append(("mongodb_up", "Resultado del último ping a MongoDB", {}, int(db_health.status["ok"])))
+    return gauges
+
+register_gauges(_process_gauges)
 
 @app.get("/")
 async def root():
     return {"message": "Welcome to MarketingCRM!"}
+
+@app.get("/healthz")
+async def healthz():
+    """Estado de la base de datos según el último ping en segundo plano"""
+    health = app.db_health
+    status_code = 200 if health.is_healthy() else 503
+    return JSONResponse(
+        {**health.status, "checked_at": health.status["checked_at"].isoformat() if health.status["checked_at"] else None},
+        status_code=status_code
+    )
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Métricas en formato de texto de Prometheus"""
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
@@ -0,0 +1,141 @@
+"""Comandos de mantenimiento del backend.
+
+Uso: python manage.py <comando>
+"""
+import argparse
+import asyncio
+import sys
+from config import DATABASE_NAME, JOB_WORKERS
+from database import create_mongo_client
+from storage import create_blob_store
+from indexes import ensure_indexes, verify_indexes, find_collscans
+from rollups import rebuild_rollups
+from jobs import JobQueue, JobWorker
+
+
+async def migrate_blobs(db, args):
+    """Mueve las imágenes embebidas en `orders.file.data` al almacén de blobs."""
+    store = create_blob_store(db)
+    orders = db["orders"]
+    migrated = 0
+    cursor = orders.find({"file.data": {"$exists": True}}, {"order_id": 1, "file": 1})
+    async for order in cursor:
+        file_data = order["file"]
+        file_ref = await store.save_bytes(
+            bytes(file_data["data"]), file_data.get("filename", f"{order['order_id']}"), file_data.get("content_type", "application/octet-stream")
+        )
+        # Solo se reemplaza si el documento sigue teniendo los bytes embebidos
+        result = await orders.update_one(
+            {"_id": order["_id"], "file.data": {"$exists": True}},
+            {"$set": {"file": file_ref}}
+        )
+        if result.modified_count:
+            migrated += 1
+        else:
+            await store.delete(file_ref["blob_id"])
+    print(f"Comprobantes migrados: {migrated}")
+
+
+async def ensure_indexes_command(db, args):
+    """Aplica el registro de índices de indexes.py."""
+    results = await ensure_indexes(db)
+    failed = False
+    for collection_name, result in results.items():
+        if isinstance(result, Exception):
+            failed = True
+            print(f"{collection_name}: ERROR {result}")
+        else:
+            print(f"{collection_name}: {', '.join(result)}")
+    if failed:
+        sys.exit(1)
+
+
+async def verify_indexes_command(db, args):
+    """Falla si falta algún índice declarado."""
+    missing = await verify_indexes(db)
+    if missing:
+        print(f"Índices faltantes: {', '.join(missing)}")
+        sys.exit(1)
+    print("Todos los índices declarados existen")
+
+
+async def explain_queries(db, args):
+    """Falla si alguna consulta de las rutas hace un COLLSCAN."""
+    offenders = await find_collscans(db)
+    if offenders:
+        print(f"Consultas con COLLSCAN: {', '.join(offenders)}")
+        sys.exit(1)
+    print("Ninguna consulta hace COLLSCAN")
+
+
+async def rebuild_rollups_command(db, args):
+    """Recalcula `order_rollups` desde `orders`."""
+    await rebuild_rollups(db)
+    print("Acumulados recalculados")
+
+
+async def worker_command(db, args):
+    """Consume la cola de trabajos hasta que se interrumpa el proceso."""
+    worker = JobWorker(JobQueue(db["jobs"]), db, create_blob_store(db), concurrency=args.concurrency)
+    print(f"Worker {worker.worker_id} con {worker.concurrency} tareas")
+    await worker.run()
+
+
+async def requeue_dead_jobs(db, args):
+    """Vuelve a encolar los trabajos que agotaron sus intentos."""
+    count = await JobQueue(db["jobs"]).requeue_dead(args.type)
+    print(f"Trabajos reencolados: {count}")
+
+
+async def enqueue_pending_receipts(db, args):
+    """Encola la normalización de los comprobantes que siguen en "pending"."""
+    queue = JobQueue(db["jobs"])
+    count = 0
+    async for order in db["orders"].find({"file.status": "pending"}, {"order_id": 1}):
+        await queue.enqueue("process_receipt", {"order_id": order["order_id"]})
+        count += 1
+    print(f"Comprobantes encolados: {count}")
+
+
+COMMANDS = {
+    "migrate-blobs": migrate_blobs,
+    "ensure-indexes": ensure_indexes_command,
+    "verify-indexes": verify_indexes_command,
+    "explain-queries": explain_queries,
+    "rebuild-rollups": rebuild_rollups_command,
+    "worker": worker_command,
+    "requeue-dead-jobs": requeue_dead_jobs,
+    "enqueue-pending-receipts": enqueue_pending_receipts,
+}
+
+
+async def run(command: str, args):
+    client = create_mongo_client()
+    try:
+        await COMMANDS[command](client[DATABASE_NAME], args)
+    finally:
+        client.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Comandos de mantenimiento de MarketingCRM")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("migrate-blobs", help="Mueve los comprobantes embebidos en los pedidos al almacén de blobs")
+    subparsers.add_parser("ensure-indexes", help="Crea los índices declarados junto a los modelos")
+    subparsers.add_parser("verify-indexes", help="Comprueba que existan todos los índices declarados")
+    subparsers.add_parser("explain-queries", help="Ejecuta explain() sobre las consultas de las rutas y falla ante un COLLSCAN")
+    subparsers.add_parser("rebuild-rollups", help="Recalcula los acumulados de ventas desde los pedidos")
+    worker_parser = subparsers.add_parser("worker", help="Ejecuta los trabajos en segundo plano de la colección jobs")
+    worker_parser.add_argument("--concurrency", type=int, default=JOB_WORKERS)
+    requeue_parser = subparsers.add_parser("requeue-dead-jobs", help="Vuelve a encolar los trabajos en estado dead")
+    requeue_parser.add_argument("--type", help="Solo los trabajos de este tipo")
+    subparsers.add_parser("enqueue-pending-receipts", help="Encola los comprobantes que no se han normalizado")
+    args = parser.parse_args()
+    try:
+        asyncio.run(run(args.command, args))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,192 @@
+import bisect
+import logging
+import time
+from threading import Lock
+import bson
+from pymongo import monitoring
+from config import SLOW_COMMAND_THRESHOLD_MS
+
+slow_command_logger = logging.getLogger("marketingcrm.mongo.slow")
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_registry = []
+_collectors = []
+
+
+def _format_labels(names, values, extra=None) -> str:
+    pairs = list(zip(names, values)) + (extra or [])
+    if not pairs:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, v in pairs)
+    return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + "}"
+
+
+class Counter:
+    def __init__(self, name: str, documentation: str, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = Lock()
+        _registry.append(self)
+
+    def inc(self, *labels, amount: float = 1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self):
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} counter"
+        with self._lock:
+            for labels, value in self._values.items():
+                yield f"{self.name}{_format_labels(self.labelnames, labels)} {value}"
+
+
+class Histogram:
+    def __init__(self, name: str, documentation: str, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._values = {}
+        self._lock = Lock()
+        _registry.append(self)
+
+    def observe(self, value: float, *labels):
+        with self._lock:
+            state = self._values.get(labels)
+            if state is None:
+                state = self._values[labels] = [[0] * len(self.buckets), 0.0, 0]
+            index = bisect.bisect_left(self.buckets, value)
+            if index < len(self.buckets):
+                state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    def render(self):
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} histogram"
+        with self._lock:
+            for labels, (bucket_counts, total, count) in self._values.items():
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets, bucket_counts):
+                    cumulative += bucket_count
+                    yield f"{self.name}_bucket{_format_labels(self.labelnames, labels, [('le', bound)])} {cumulative}"
+                yield f"{self.name}_bucket{_format_labels(self.labelnames, labels, [('le', '+Inf')])} {count}"
+                yield f"{self.name}_sum{_format_labels(self.labelnames, labels)} {total}"
+                yield f"{self.name}_count{_format_labels(self.labelnames, labels)} {count}"
+
+
+def register_gauges(callback):
+    """Registra una función que devuelve `[(nombre, ayuda, {etiquetas}, valor)]` al exportar."""
+    _collectors.append(callback)
+
+
+def render_metrics() -> str:
+    """Todas las métricas en formato de texto de Prometheus."""
+    lines = []
+    for metric in _registry:
+        lines.extend(metric.render())
+    declared = set()
+    for callback in _collectors:
+        for name, documentation, labels, value in callback():
+            if name not in declared:
+                lines.append(f"# HELP {name} {documentation}")
+                lines.append(f"# TYPE {name} gauge")
+                declared.add(name)
+            lines.append(f"{name}{_format_labels(list(labels), list(labels.values()))} {value}")
+    return "\n".join(lines) + "\n"
+
+
+http_request_duration = Histogram(
+    "http_request_duration_seconds", "Latencia de las peticiones HTTP por ruta", ("method", "route")
+)
+http_responses = Counter(
+    "http_responses_total", "Respuestas HTTP por ruta y código de estado", ("method", "route", "status")
+)
+mongo_command_duration = Histogram(
+    "mongodb_command_duration_seconds", "Duración de los comandos de MongoDB", ("collection", "command")
+)
+mongo_command_reply_bytes = Counter(
+    "mongodb_command_reply_bytes_total", "Bytes devueltos por los comandos de MongoDB", ("collection", "command")
+)
+mongo_command_failures = Counter(
+    "mongodb_command_failures_total", "Comandos de MongoDB fallidos", ("collection", "command")
+)
+
+
+class MetricsMiddleware:
+    """Middleware ASGI que mide latencia y códigos de estado por plantilla de ruta."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status_holder = {"status": 500}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status_holder["status"] = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            # El router deja la ruta resuelta en el scope; se usa su plantilla, no la URL real
+            route = scope.get("route")
+            template = getattr(route, "path", None) or "<unmatched>"
+            method = scope.get("method", "")
+            http_request_duration.observe(time.perf_counter() - started, method, template)
+            http_responses.inc(method, template, str(status_holder["status"]))
+
+
+class CommandMetricsListener(monitoring.CommandListener):
+    """Registra duración y bytes devueltos de cada comando, y anota los lentos."""
+
+    def __init__(self, slow_threshold_ms: float = SLOW_COMMAND_THRESHOLD_MS):
+        self.slow_threshold_ms = slow_threshold_ms
+        self._pending = {}
+        self._lock = Lock()
+
+    @staticmethod
+    def _key(event):
+        return (event.connection_id, event.request_id)
+
+    def started(self, event):
+        # El nombre de la colección solo viene en el evento de inicio
+        collection = event.command.get(event.command_name)
+        if event.command_name == "getMore":
+            collection = event.command.get("collection")
+        if not isinstance(collection, str):
+            collection = ""
+        with self._lock:
+            self._pending[self._key(event)] = (collection, event.database_name)
+
+    def _pop(self, event):
+        with self._lock:
+            return self._pending.pop(self._key(event), ("", ""))
+
+    def succeeded(self, event):
+        collection, database = self._pop(event)
+        seconds = event.duration_micros / 1_000_000
+        mongo_command_duration.observe(seconds, collection, event.command_name)
+        try:
+            reply_bytes = len(bson.encode(event.reply))
+        except Exception:
+            reply_bytes = 0
+        mongo_command_reply_bytes.inc(collection, event.command_name, amount=reply_bytes)
+        if seconds * 1000 >= self.slow_threshold_ms:
+            slow_command_logger.warning(
+                "Comando lento: %s.%s %s %.1f ms", database, collection, event.command_name, seconds * 1000
+            )
+
+    def failed(self, event):
+        collection, _ = self._pop(event)
+        mongo_command_duration.observe(event.duration_micros / 1_000_000, collection, event.command_name)
+        mongo_command_failures.inc(collection, event.command_name)
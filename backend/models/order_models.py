@@ -1,6 +1,47 @@
+import re
 from pydantic import BaseModel, Field
-from typing import Optional
+from typing import Optional, List
 from datetime import datetime
+from config import BULK_STATUS_MAX_ITEMS
+from pymongo import ASCENDING, DESCENDING, TEXT, IndexModel
+
+# Índices de la colección `orders` (ver indexes.py)
+ORDER_INDEXES = [
+    IndexModel([("order_id", ASCENDING)], name="order_id_unique", unique=True),
+    IndexModel([("user_id", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)], name="user_id_created_at"),
+    IndexModel([("created_at", DESCENDING), ("_id", DESCENDING)], name="created_at"),
+    # Filtros del listado de administración (igualdad + orden por created_at)
+    IndexModel([("status", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)], name="status_created_at"),
+    IndexModel([("serviceType", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)], name="serviceType_created_at"),
+    IndexModel([("status", ASCENDING), ("serviceType", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)], name="status_serviceType_created_at"),
+    IndexModel([("transfer_id", ASCENDING)], name="transfer_id"),
+    IndexModel([("client_name", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)], name="client_name_created_at"),
+    IndexModel([("client_name", TEXT)], name="client_name_text"),
+]
+
+# Índices de la colección `order_rollups` (ver rollups.py)
+ORDER_ROLLUP_INDEXES = [
+    IndexModel([("day", ASCENDING)], name="day"),
+]
+
+# Estados de un pedido y transiciones permitidas desde cada uno
+ORDER_STATUSES = ["Procesando Pago", "Aprobado", "Finalizado", "Cancelado"]
+ALLOWED_STATUS_TRANSITIONS = {
+    "Procesando Pago": {"Aprobado", "Cancelado"},
+    "Aprobado": {"Procesando Pago", "Finalizado", "Cancelado"},
+    "Finalizado": {"Aprobado"},
+    "Cancelado": {"Procesando Pago"},
+}
+
+def status_change_error(old_status: str, new_status: str) -> Optional[str]:
+    """Motivo por el que un pedido no puede pasar de `old_status` a `new_status`, o None si puede."""
+    if new_status not in ORDER_STATUSES:
+        return "invalid_status"
+    if new_status == old_status:
+        return "unchanged"
+    if new_status not in ALLOWED_STATUS_TRANSITIONS.get(old_status, set()):
+        return "invalid_transition"
+    return None
 
 class OrderBase(BaseModel):
     order_id: str
@@ -17,3 +58,95 @@ class OrderCreate(OrderBase):
 
 class OrderResponse(OrderBase):
     id: str
+
+class OrderStatusChange(BaseModel):
+    status: str
+
+class OrderStatusUpdate(BaseModel):
+    order_id: str
+    status: str
+
+class BulkStatusUpdateRequest(BaseModel):
+    updates: List[OrderStatusUpdate] = Field(max_length=BULK_STATUS_MAX_ITEMS)
+
+class OrderListItem(BaseModel):
+    """Fila del listado de pedidos del administrador."""
+    order_id: str
+    client_name: str
+    serviceType: str
+    transfer_id: str
+    file_name: Optional[str] = None
+    thumbnail_url: Optional[str] = None
+    status: str
+    created_at: datetime
+
+class MyOrderItem(BaseModel):
+    """Fila del listado de pedidos del propio cliente."""
+    order_id: str
+    serviceType: str
+    status: str
+    created_at: datetime
+
+class OrderListPage(BaseModel):
+    items: List[OrderListItem]
+    next_cursor: Optional[str] = None
+
+class MyOrderPage(BaseModel):
+    items: List[MyOrderItem]
+    next_cursor: Optional[str] = None
+
+# Campos que hay que proyectar desde `orders` para construir cada fila
+ORDER_LIST_PROJECTION = {"order_id": 1, "client_name": 1, "serviceType": 1, "transfer_id": 1, "file.filename": 1, "thumbnail.blob_id": 1, "status": 1, "created_at": 1}
+MY_ORDER_PROJECTION = {"order_id": 1, "serviceType": 1, "status": 1, "created_at": 1}
+
+def order_list_item_from_doc(order: dict) -> OrderListItem:
+    return OrderListItem(
+        order_id=order["order_id"],
+        client_name=order.get("client_name", "Desconocido"),
+        serviceType=order["serviceType"],
+        transfer_id=order["transfer_id"],
+        file_name=order["file"]["filename"] if "file" in order else None,
+        thumbnail_url=f"/admin/orders/{order['order_id']}/thumbnail" if "thumbnail" in order else None,
+        status=order["status"],
+        created_at=order["created_at"],
+    )
+
+def my_order_item_from_doc(order: dict) -> MyOrderItem:
+    return MyOrderItem(
+        order_id=order["order_id"],
+        serviceType=order["serviceType"],
+        status=order["status"],
+        created_at=order["created_at"],
+    )
+
+def build_order_filter(status: str = None, service_type: str = None, created_from: datetime = None,
+                       created_to: datetime = None, transfer_id: str = None, order_id: str = None,
+                       client_name: str = None, text: str = None) -> dict:
+    """Arma el filtro de `orders` para el listado de administración.
+
+    Cada combinación se apoya en uno de los índices de ORDER_INDEXES:
+    `status`/`serviceType` por igualdad, rango de `created_at`, `order_id` y
+    `transfer_id` exactos, prefijo de `client_name` (distingue mayúsculas) o
+    búsqueda de texto sobre `client_name`.
+    """
+    query = {}
+    if order_id:
+        query["order_id"] = order_id
+    if transfer_id:
+        query["transfer_id"] = transfer_id
+    if status:
+        query["status"] = status
+    if service_type:
+        query["serviceType"] = service_type
+    if created_from or created_to:
+        query["created_at"] = {}
+        if created_from:
+            query["created_at"]["$gte"] = created_from
+        if created_to:
+            query["created_at"]["$lt"] = created_to
+    if client_name:
+        # Un prefijo anclado sin `i` puede recorrer el índice como un rango
+        query["client_name"] = {"$regex": f"^{re.escape(client_name)}"}
+    if text:
+        query["$text"] = {"$search": text}
+    return query
@@ -1,6 +1,11 @@
-from pydantic import BaseModel, EmailStr, Field
-from bson import ObjectId
+from pydantic import BaseModel, ConfigDict, EmailStr, Field
 from typing import Optional
+from pymongo import ASCENDING, IndexModel
+
+# Índices de la colección `users` (ver indexes.py)
+USER_INDEXES = [
+    IndexModel([("email", ASCENDING)], name="email_unique", unique=True),
+]
 
 class UserBase(BaseModel):
     email: EmailStr
@@ -23,11 +28,7 @@ class User(UserBase, UserProfile):
     is_active: bool
     role: Optional[str] = "user" 
 
-    class Config:
-        from_attributes = True
-        json_encoders = {
-            ObjectId: str
-        }
+    model_config = ConfigDict(from_attributes=True)
 
 class UserResponse(UserBase, UserProfile):
     id: str
@@ -35,16 +36,26 @@ class UserResponse(UserBase, UserProfile):
     role: Optional[str] = "user"
     isIdNumberLocked: Optional[bool] = False  # 🚀 Incluir este campo
 
-
-    class Config:
-        from_attributes = True
-        json_encoders = {
-            ObjectId: str
-        }
+    model_config = ConfigDict(from_attributes=True)
 
 class UserUpdate(BaseModel):
     name: str
     idType: str
     idNumber: str
     phone: str
-    address: str
\ No newline at end of file
+    address: str
+
+def user_response_from_doc(user: dict) -> UserResponse:
+    """Convierte un documento de `users` en la respuesta pública del perfil."""
+    return UserResponse(
+        id=str(user["_id"]),
+        email=user["email"],
+        is_active=user.get("is_active", True),
+        role=user["role"],
+        name=user.get("name", ""),
+        idType=user.get("idType", ""),
+        idNumber=user.get("idNumber", ""),
+        phone=user.get("phone", ""),
+        address=user.get("address", ""),
+        isIdNumberLocked=user.get("isIdNumberLocked", False)  # 🚀 Incluye el estado de bloqueo
+    )
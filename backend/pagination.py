@@ -0,0 +1,63 @@
+import base64
+import json
+from datetime import datetime
+from bson import ObjectId
+from pymongo import DESCENDING
+from config import PAGE_SIZE_DEFAULT, PAGE_SIZE_MAX
+
+# Orden estable de los listados: más recientes primero, `_id` como desempate
+KEYSET_SORT = [("created_at", DESCENDING), ("_id", DESCENDING)]
+
+
+class InvalidCursor(Exception):
+    """El cursor recibido no se pudo decodificar."""
+
+
+def encode_cursor(doc: dict) -> str:
+    """Cursor opaco con la posición `(created_at, _id)` del último documento."""
+    raw = json.dumps({"t": doc["created_at"].isoformat(), "id": str(doc["_id"])})
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str):
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return datetime.fromisoformat(data["t"]), ObjectId(data["id"])
+    except Exception:
+        raise InvalidCursor()
+
+
+def keyset_filter(query: dict, after: str = None) -> dict:
+    """Añade al filtro la condición "después del cursor" según `KEYSET_SORT`."""
+    if not after:
+        return query
+    created_at, last_id = decode_cursor(after)
+    position = {"$or": [
+        {"created_at": {"$lt": created_at}},
+        {"created_at": created_at, "_id": {"$lt": last_id}},
+    ]}
+    return {"$and": [query, position]} if query else position
+
+
+def clamp_limit(limit: int = None) -> int:
+    if not limit or limit < 1:
+        return PAGE_SIZE_DEFAULT
+    return min(limit, PAGE_SIZE_MAX)
+
+
+async def fetch_page(collection, query: dict, projection: dict, limit: int = None, after: str = None):
+    """Devuelve `(documentos, siguiente_cursor)` para una página del listado.
+
+    Se pide un documento extra para saber si existe una página siguiente sin
+    hacer un `count`.
+    """
+    limit = clamp_limit(limit)
+    projection = {**projection, "created_at": 1}
+    cursor = collection.find(keyset_filter(query, after), projection).sort(KEYSET_SORT).limit(limit + 1)
+    docs = await cursor.to_list(limit + 1)
+    next_cursor = None
+    if len(docs) > limit:
+        docs = docs[:limit]
+        next_cursor = encode_cursor(docs[-1])
+    return docs, next_cursor
@@ -0,0 +1,92 @@
+import io
+import os
+from starlette.concurrency import run_in_threadpool
+from config import RECEIPT_MAX_SIDE, RECEIPT_JPEG_QUALITY, RECEIPT_THUMBNAIL_SIDE, RECEIPT_KEEP_ORIGINAL, RECEIPT_MAX_PIXELS
+
+
+class InvalidReceipt(Exception):
+    """El archivo subido no es una imagen decodificable."""
+
+
+def _to_jpeg(image, max_side: int, quality: int) -> bytes:
+    image = image.copy()
+    image.thumbnail((max_side, max_side))
+    output = io.BytesIO()
+    # Sin `exif=` ni `icc_profile=`: el JPEG resultante no lleva metadatos
+    image.save(output, format="JPEG", quality=quality, optimize=True)
+    return output.getvalue()
+
+
+def normalize_image(data: bytes, max_side: int = RECEIPT_MAX_SIDE, quality: int = RECEIPT_JPEG_QUALITY,
+                    thumbnail_side: int = RECEIPT_THUMBNAIL_SIDE, max_pixels: int = RECEIPT_MAX_PIXELS):
+    """Decodifica el comprobante una sola vez y devuelve `(imagen, miniatura)` en JPEG.
+
+    Aplica la orientación EXIF, descarta los metadatos y reduce la imagen a
+    `max_side` píxeles en su lado mayor. Las imágenes de más de `max_pixels`
+    se rechazan antes de decodificarlas, y los JPEG se decodifican ya
+    reducidos para no ocupar la memoria de la foto a resolución completa.
+    """
+    # Pillow se carga con el primer comprobante, en el worker de la cola
+    from PIL import Image, ImageOps
+    try:
+        with Image.open(io.BytesIO(data)) as image:
+            # El tamaño sale de la cabecera: todavía no se decodificó nada
+            width, height = image.size
+            if width * height > max_pixels:
+                raise InvalidReceipt(f"La imagen tiene {width}x{height} píxeles, más de {max_pixels}")
+            if image.format == "JPEG":
+                image.draft("RGB", (max_side, max_side))
+            image.load()
+            image = ImageOps.exif_transpose(image)
+            if image.mode != "RGB":
+                image = image.convert("RGB")
+    except Exception as e:
+        raise InvalidReceipt(str(e))
+    return _to_jpeg(image, max_side, quality), _to_jpeg(image, thumbnail_side, quality)
+
+
+async def process_receipt(db, store, order_id: str):
+    """Normaliza el comprobante de un pedido y genera su miniatura.
+
+    Se ejecuta fuera del camino de la petición; si el pedido ya fue
+    procesado no hace nada, así que puede reintentarse sin riesgo.
+    """
+    orders = db["orders"]
+    order = await orders.find_one({"order_id": order_id}, {"file": 1})
+    if not order or "file" not in order or "blob_id" not in order["file"]:
+        return
+    original = order["file"]
+    if original.get("status") in ("ready", "invalid"):
+        return
+
+    data = await store.read(original["blob_id"], original["length"])
+    try:
+        image_bytes, thumbnail_bytes = await run_in_threadpool(normalize_image, data)
+    except InvalidReceipt as e:
+        print(f"Comprobante inválido en el pedido {order_id}: {e}")
+        await orders.update_one(
+            {"_id": order["_id"], "file.blob_id": original["blob_id"]},
+            {"$set": {"file.status": "invalid"}}
+        )
+        return
+
+    stem = os.path.splitext(original.get("filename") or order_id)[0]
+    file_ref = await store.save_bytes(image_bytes, f"{stem}.jpg", "image/jpeg")
+    file_ref["status"] = "ready"
+    thumbnail_ref = await store.save_bytes(thumbnail_bytes, f"{stem}_thumb.jpg", "image/jpeg")
+
+    update = {"file": file_ref, "thumbnail": thumbnail_ref}
+    if RECEIPT_KEEP_ORIGINAL:
+        update["original_file"] = original
+    result = await orders.update_one(
+        {"_id": order["_id"], "file.blob_id": original["blob_id"]},
+        {"$set": update}
+    )
+    if not result.modified_count:
+        # Otro proceso ya reemplazó el comprobante: descartar lo generado
+        await store.delete(file_ref["blob_id"])
+        await store.delete(thumbnail_ref["blob_id"])
+        return
+    if not RECEIPT_KEEP_ORIGINAL:
+        await store.delete(original["blob_id"])
+
@@ -0,0 +1,139 @@
+import asyncio
+import random
+import time
+import pymongo
+from fastapi import HTTPException, status
+from pymongo.errors import ConnectionFailure, ExecutionTimeout, OperationFailure, PyMongoError, WTimeoutError
+from config import (
+    DB_OPERATION_DEADLINE_MS, DB_RETRY_ATTEMPTS, DB_RETRY_BASE_MS,
+    DB_CIRCUIT_FAILURE_THRESHOLD, DB_CIRCUIT_RESET_SECONDS,
+)
+from metrics import Counter
+
+# Códigos de MongoDB que indican un problema pasajero del clúster (elecciones, apagado, red)
+RETRYABLE_CODES = {6, 7, 89, 91, 189, 262, 9001, 10107, 11600, 11602, 13435, 13436}
+
+db_retries = Counter("mongodb_operation_retries_total", "Reintentos de operaciones de MongoDB", ("operation",))
+db_unavailable = Counter(
+    "mongodb_operation_unavailable_total", "Operaciones de MongoDB respondidas con 503", ("operation", "reason")
+)
+
+
+class DatabaseUnavailable(HTTPException):
+    """La base de datos no respondió a tiempo o el circuito está abierto; se responde 503."""
+
+    def __init__(self, reason: str, retry_after: int = 1):
+        super().__init__(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Base de datos no disponible, intenta de nuevo",
+            headers={"Retry-After": str(retry_after)},
+        )
+        self.reason = reason
+
+
+class CircuitBreaker:
+    """Abre el circuito tras `failure_threshold` fallos seguidos y falla rápido.
+
+    Pasados `reset_seconds` deja pasar una operación de prueba: si sale bien
+    se cierra, si falla vuelve a abrirse.
+    """
+
+    def __init__(self, failure_threshold: int, reset_seconds: float):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.failures = 0
+        self.opened_at = None
+        self._probe_started = None
+
+    @property
+    def is_open(self) -> bool:
+        return self.opened_at is not None
+
+    def before_call(self) -> bool:
+        """Falla rápido con el circuito abierto; devuelve True si esta llamada es la prueba."""
+        if self.opened_at is None:
+            return False
+        now = time.monotonic()
+        remaining = self.reset_seconds - (now - self.opened_at)
+        # Una sola prueba a la vez; si la prueba se canceló sin resultado, se permite otra tras `reset_seconds`
+        probing = self._probe_started is not None and now - self._probe_started < self.reset_seconds
+        if remaining > 0 or probing:
+            raise DatabaseUnavailable("circuit_open", retry_after=max(1, int(remaining + 0.999)))
+        self._probe_started = now
+        return True
+
+    def release_probe(self):
+        """La prueba terminó sin decir nada del clúster: la siguiente llamada puede probar."""
+        self._probe_started = None
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+        self._probe_started = None
+
+    def record_failure(self):
+        self.failures += 1
+        self._probe_started = None
+        if self.opened_at is not None or self.failures >= self.failure_threshold:
+            self.opened_at = time.monotonic()
+
+
+db_breaker = CircuitBreaker(DB_CIRCUIT_FAILURE_THRESHOLD, DB_CIRCUIT_RESET_SECONDS)
+
+
+def is_retryable(error: Exception) -> bool:
+    if isinstance(error, (ConnectionFailure, WTimeoutError)):
+        return True
+    if isinstance(error, OperationFailure) and not isinstance(error, ExecutionTimeout):
+        return error.code in RETRYABLE_CODES or error.has_error_label("RetryableWriteError")
+    return False
+
+
+async def db_call(operation, name: str, deadline_ms: float = DB_OPERATION_DEADLINE_MS,
+                  retries: int = DB_RETRY_ATTEMPTS, breaker: CircuitBreaker = db_breaker):
+    """Ejecuta `operation()` con plazo total, reintentos acotados y circuit breaker.
+
+    `operation` es una función sin argumentos que devuelve el awaitable; se
+    vuelve a llamar en cada intento. Las escrituras que no son idempotentes
+    deben pasar `retries=0` (el driver ya aplica sus retryable writes). Los
+    errores que no son del clúster (p. ej. `DuplicateKeyError`) se propagan tal cual.
+    """
+    probing = breaker.before_call()
+    deadline = time.monotonic() + deadline_ms / 1000
+    attempt = 0
+    try:
+        while True:
+            remaining = deadline - time.monotonic()
+            try:
+                # El plazo también se pasa al driver para que no siga esperando por su cuenta
+                with pymongo.timeout(remaining):
+                    result = await asyncio.wait_for(operation(), remaining)
+            except (asyncio.TimeoutError, ExecutionTimeout) as e:
+                breaker.record_failure()
+                db_unavailable.inc(name, "deadline")
+                raise DatabaseUnavailable("deadline") from e
+            except Exception as e:
+                if not is_retryable(e):
+                    # Un error de MongoDB que no es del clúster (p. ej. DuplicateKeyError) prueba que responde
+                    if isinstance(e, PyMongoError):
+                        breaker.record_success()
+                    raise
+                # Jitter completo, sin pasarse del plazo que queda
+                delay = random.uniform(0, DB_RETRY_BASE_MS * 2 ** attempt) / 1000
+                if attempt >= retries or time.monotonic() + delay >= deadline:
+                    # Al breaker le cuenta la operación fallida, no cada intento
+                    breaker.record_failure()
+                    print(f"MongoDB no disponible en {name}: {e}")
+                    db_unavailable.inc(name, "error")
+                    raise DatabaseUnavailable("error") from e
+                attempt += 1
+                db_retries.inc(name)
+                await asyncio.sleep(delay)
+            else:
+                breaker.record_success()
+                return result
+    finally:
+        # Errores de la aplicación (p. ej. InvalidCursor) o cancelaciones no deciden nada:
+        # se libera la prueba para que la siguiente llamada pueda hacerla
+        if probing:
+            breaker.release_probe()
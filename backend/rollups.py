@@ -0,0 +1,98 @@
+from pymongo import UpdateOne
+from models.order_models import ORDER_ROLLUP_INDEXES
+
+ROLLUP_COLLECTION = "order_rollups"
+
+
+def _rollup_update(order: dict, status: str, sign: int) -> UpdateOne:
+    day = order["created_at"].strftime("%Y-%m-%d")
+    key = {"day": day, "serviceType": order["serviceType"], "status": status}
+    return UpdateOne(
+        {"_id": key},
+        {
+            "$inc": {"count": sign, "amount": sign * order.get("amount", 0)},
+            "$setOnInsert": key,
+        },
+        upsert=True,
+    )
+
+
+async def record_order_created(db, order: dict):
+    """Suma un pedido nuevo al acumulado de su día, tipo de servicio y estado."""
+    try:
+        await db[ROLLUP_COLLECTION].bulk_write([_rollup_update(order, order["status"], 1)])
+    except Exception as e:
+        print(f"Error al actualizar los acumulados del pedido {order.get('order_id')}: {e}")
+
+
+async def record_status_changes(db, changes: list):
+    """Mueve pedidos entre estados en los acumulados.
+
+    `changes` es una lista de `(pedido, estado_anterior, estado_nuevo)`; el
+    pedido debe incluir `created_at`, `serviceType` y `amount`.
+    """
+    operations = []
+    for order, old_status, new_status in changes:
+        if old_status == new_status:
+            continue
+        operations.append(_rollup_update(order, old_status, -1))
+        operations.append(_rollup_update(order, new_status, 1))
+    if not operations:
+        return
+    try:
+        await db[ROLLUP_COLLECTION].bulk_write(operations, ordered=False)
+    except Exception as e:
+        print(f"Error al actualizar los acumulados por cambio de estado: {e}")
+
+
+async def rebuild_rollups(db):
+    """Recalcula los acumulados desde `orders` y reemplaza la colección de una vez.
+
+    Los incrementos que lleguen mientras corre la agregación se pierden; se
+    recomienda ejecutarlo en una ventana de poco tráfico.
+    """
+    staging = f"{ROLLUP_COLLECTION}_rebuild"
+    pipeline = [
+        {"$group": {
+            "_id": {
+                "day": {"$dateToString": {"format": "%Y-%m-%d", "date": "$created_at"}},
+                "serviceType": "$serviceType",
+                "status": "$status",
+            },
+            "count": {"$sum": 1},
+            "amount": {"$sum": {"$ifNull": ["$amount", 0]}},
+        }},
+        {"$set": {"day": "$_id.day", "serviceType": "$_id.serviceType", "status": "$_id.status"}},
+        {"$out": staging},
+    ]
+    await db["orders"].aggregate(pipeline).to_list(None)
+    await db[staging].rename(ROLLUP_COLLECTION, dropTarget=True)
+    # El renombrado no conserva los índices de la colección reemplazada
+    await db[ROLLUP_COLLECTION].create_indexes(ORDER_ROLLUP_INDEXES)
+
+
+async def read_stats(db, start_day: str = None, end_day: str = None) -> dict:
+    """Totales por día, tipo de servicio y estado leyendo solo los acumulados."""
+    query = {"count": {"$gt": 0}}
+    if start_day or end_day:
+        query["day"] = {}
+        if start_day:
+            query["day"]["$gte"] = start_day
+        if end_day:
+            query["day"]["$lte"] = end_day
+
+    rows = []
+    totals = {"count": 0, "amount": 0}
+    by_status = {}
+    by_service = {}
+    cursor = db[ROLLUP_COLLECTION].find(query, {"_id": 0, "day": 1, "serviceType": 1, "status": 1, "count": 1, "amount": 1})
+    async for row in cursor.sort("day", 1):
+        rows.append(row)
+        totals["count"] += row["count"]
+        totals["amount"] += row["amount"]
+        for bucket, key in ((by_status, row["status"]), (by_service, row["serviceType"])):
+            entry = bucket.setdefault(key, {"count": 0, "amount": 0})
+            entry["count"] += row["count"]
+            entry["amount"] += row["amount"]
+
+    return {"totals": totals, "by_status": by_status, "by_serviceType": by_service, "days": rows}
@@ -0,0 +1,211 @@
+from fastapi import APIRouter, HTTPException, Request, Security, Query
+from fastapi.responses import Response, StreamingResponse
+from bson import ObjectId
+from datetime import datetime, timedelta, date
+from typing import List
+from config import (
+    INVOICE_EXPORT_BATCH_SIZE, INVOICE_EXPORT_MAX_ORDERS, EXPORT_BATCH_SIZE_DEFAULT, EXPORT_BATCH_SIZE_MAX,
+)
+from database import get_collection, get_read_database
+from resilience import db_breaker, db_call, DatabaseUnavailable
+from models.order_models import build_order_filter
+from storage import parse_range
+from invoices import stream_invoice_zip, CLIENT_FIELDS
+from rollups import read_stats
+from exports import stream_orders_csv, stream_orders_ndjson
+from routers.dependencies import get_current_admin
+
+router = APIRouter()
+
+@router.get("/admin/orders/export")
+async def export_orders(
+    request: Request,
+    format: str = Query("csv", pattern="^(csv|ndjson)$"),
+    batch_size: int = Query(EXPORT_BATCH_SIZE_DEFAULT, ge=1, le=EXPORT_BATCH_SIZE_MAX),
+    include_client: bool = Query(False),
+    status: str = Query(None),
+    serviceType: str = Query(None),
+    created_from: date = Query(None),
+    created_to: date = Query(None),
+    user: dict = Security(get_current_admin)
+):
+    """Exporta todos los pedidos en CSV o NDJSON con memoria constante (solo administradores)"""
+    query = build_order_filter(
+        status=status,
+        service_type=serviceType,
+        created_from=datetime.combine(created_from, datetime.min.time()) if created_from else None,
+        created_to=datetime.combine(created_to + timedelta(days=1), datetime.min.time()) if created_to else None,
+    )
+    # El export dura lo que tarde el cliente en descargarlo: no lleva plazo, pero no empieza con el circuito abierto
+    if db_breaker.is_open:
+        raise DatabaseUnavailable("circuit_open")
+    read_db = get_read_database(request)
+    if format == "csv":
+        body = stream_orders_csv(read_db, query, batch_size, include_client)
+        media_type = "text/csv; charset=utf-8"
+    else:
+        body = stream_orders_ndjson(read_db, query, batch_size, include_client)
+        media_type = "application/x-ndjson"
+
+    return StreamingResponse(
+        body,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="pedidos.{format}"'}
+    )
+
+@router.get("/admin/stats")
+async def get_admin_stats(
+    request: Request,
+    start: date = Query(None),
+    end: date = Query(None),
+    user: dict = Security(get_current_admin)
+):
+    """Totales de pedidos por día, tipo de servicio y estado (solo lee los acumulados)"""
+    return await db_call(lambda: read_stats(
+        request.app.mongodb,
+        start.isoformat() if start else None,
+        end.isoformat() if end else None
+    ), "admin_stats")
+
+async def _attach_clients(request: Request, orders: list) -> list:
+    """Empareja cada pedido con su cliente usando una sola consulta `$in` (solo los campos de la factura)."""
+    user_ids = {ObjectId(order["user_id"]) for order in orders if ObjectId.is_valid(order.get("user_id", ""))}
+    clients = {}
+    if user_ids:
+        async for client in get_collection(request, "users").find(
+            {"_id": {"$in": list(user_ids)}}, {field: 1 for field in CLIENT_FIELDS}
+        ):
+            clients[str(client["_id"])] = client
+    return [(order, clients.get(order.get("user_id"), {})) for order in orders]
+
+@router.get("/admin/invoices/export")
+async def export_invoices(
+    request: Request,
+    start: date = Query(None),
+    end: date = Query(None),
+    order_id: List[str] = Query(None),
+    user: dict = Security(get_current_admin)
+):
+    """Descarga un ZIP con las facturas de un rango de fechas o de una lista de pedidos"""
+    query = {}
+    if order_id:
+        query["order_id"] = {"$in": order_id}
+    if start or end:
+        query["created_at"] = {}
+        if start:
+            query["created_at"]["$gte"] = datetime.combine(start, datetime.min.time())
+        if end:
+            query["created_at"]["$lt"] = datetime.combine(end + timedelta(days=1), datetime.min.time())
+    if not query:
+        raise HTTPException(status_code=400, detail="Indica un rango de fechas o una lista de pedidos")
+
+    # Mejor rechazar el rango que entregar un ZIP al que le faltan facturas
+    matching = await db_call(
+        lambda: get_collection(request, "orders").count_documents(query, limit=INVOICE_EXPORT_MAX_ORDERS + 1),
+        "count_invoice_export"
+    )
+    if matching > INVOICE_EXPORT_MAX_ORDERS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"El rango incluye más de {INVOICE_EXPORT_MAX_ORDERS} pedidos; divídelo en rangos más cortos"
+        )
+
+    projection = {"order_id": 1, "user_id": 1, "serviceType": 1, "transfer_id": 1, "created_at": 1}
+
+    async def batches():
+        cursor = (
+            get_collection(request, "orders")
+            .find(query, projection)
+            .sort("created_at", 1)
+            .batch_size(INVOICE_EXPORT_BATCH_SIZE)
+        )
+        batch = []
+        async for order in cursor:
+            batch.append(order)
+            if len(batch) >= INVOICE_EXPORT_BATCH_SIZE:
+                yield await _attach_clients(request, batch)
+                batch = []
+        if batch:
+            yield await _attach_clients(request, batch)
+
+    return StreamingResponse(
+        stream_invoice_zip(batches()),
+        media_type="application/zip",
+        headers={"Content-Disposition": 'attachment; filename="facturas.zip"'}
+    )
+
+def blob_response(request: Request, file_data: dict, disposition: str = "attachment"):
+    """Respuesta en streaming de un blob con soporte de `Range` e `If-None-Match`."""
+    headers = {"Content-Disposition": f"{disposition}; filename={file_data['filename']}"}
+
+    # ✅ ETag a partir del hash del contenido; el blob nunca cambia
+    etag = f'"{file_data["sha256"]}"'
+    headers["ETag"] = etag
+    headers["Accept-Ranges"] = "bytes"
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and (if_none_match.strip() == "*" or etag in [t.strip() for t in if_none_match.split(",")]):
+        return Response(status_code=304, headers=headers)
+
+    length = file_data["length"]
+    try:
+        byte_range = parse_range(request.headers.get("range"), length)
+    except ValueError:
+        raise HTTPException(status_code=416, detail="Rango no satisfacible", headers={"Content-Range": f"bytes */{length}"})
+
+    status_code = 200
+    start, end = 0, length - 1
+    if byte_range:
+        start, end = byte_range
+        status_code = 206
+        headers["Content-Range"] = f"bytes {start}-{end}/{length}"
+    headers["Content-Length"] = str(end - start + 1 if length else 0)
+
+    # ✅ Transmitir el archivo por bloques desde el almacén de blobs
+    body = request.app.blob_store.open_range(file_data["blob_id"], start, end) if length else iter([])
+    return StreamingResponse(body, status_code=status_code, media_type=file_data["content_type"], headers=headers)
+
+@router.get("/admin/download-payment/{order_id}")
+async def download_payment_proof(
+    request: Request,
+    order_id: str,
+    user: dict = Security(get_current_admin)
+):
+    """Permite a los administradores descargar comprobantes de pago almacenados en MongoDB"""
+    try:
+        # ✅ Obtener el pedido de la base de datos
+        order = await db_call(lambda: get_collection(request, "orders").find_one({"order_id": order_id}, {"file": 1}), "find_receipt")
+        if not order or "file" not in order:
+            raise HTTPException(status_code=404, detail="Pedido o comprobante no encontrado")
+
+        file_data = order["file"]
+
+        # Pedidos antiguos aún no migrados: la imagen sigue embebida en el documento
+        if "data" in file_data:
+            return Response(
+                file_data["data"],
+                media_type=file_data["content_type"],
+                headers={"Content-Disposition": f"attachment; filename={file_data['filename']}"}
+            )
+
+        return blob_response(request, file_data)
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"Error al descargar el comprobante: {e}")
+        raise HTTPException(status_code=500, detail="No se pudo descargar el archivo")
+
+@router.get("/admin/orders/{order_id}/thumbnail")
+async def download_receipt_thumbnail(
+    request: Request,
+    order_id: str,
+    user: dict = Security(get_current_admin)
+):
+    """Miniatura del comprobante para el listado de pedidos del administrador"""
+    order = await db_call(
+        lambda: get_collection(request, "orders").find_one({"order_id": order_id}, {"thumbnail": 1}), "find_thumbnail"
+    )
+    if not order or "thumbnail" not in order:
+        raise HTTPException(status_code=404, detail="Miniatura no disponible")
+
+    return blob_response(request, order["thumbnail"], disposition="inline")
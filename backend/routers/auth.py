@@ -0,0 +1,81 @@
+from fastapi import APIRouter, Depends, HTTPException, status, Body, Request
+from fastapi.security import OAuth2PasswordRequestForm
+from pymongo.errors import DuplicateKeyError
+from config import SECRET_KEY, ALGORITHM
+from database import get_user_by_email, create_user, update_user_password
+from models.user_models import UserCreate
+from utils import hash_password_async, verify_password_async, password_needs_rehash, PasswordPoolBusy
+from routers.dependencies import create_access_token, create_refresh_token
+
+router = APIRouter()
+
+@router.post("/register")
+async def register_user(request: Request, user: UserCreate):
+    existing_user = await get_user_by_email(request, user.email)
+    if existing_user:
+        raise HTTPException(status_code=400, detail="Email already registered")
+    try:
+        hashed_pwd = await hash_password_async(user.password)
+    except PasswordPoolBusy:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Servidor ocupado, intenta de nuevo")
+    user_data = user.dict()
+    user_data["hashed_password"] = hashed_pwd
+    user_data["role"] = user_data.get("role", "user") 
+    del user_data["password"]
+    try:
+        user_id = await create_user(request, user_data)
+    except DuplicateKeyError:
+        raise HTTPException(status_code=400, detail="Email already registered")
+    if user_id:
+        access_token = create_access_token(data={"sub": user.email, "role": user_data.get("role", "user")})
+        refresh_token = create_refresh_token(data={"sub": user.email, "role": user_data.get("role", "user")})
+        return {"access_token": access_token, "refresh_token": refresh_token, "token_type": "bearer"}
+    else:
+        raise HTTPException(status_code=500, detail="Failed to create user")
+
+async def authenticate_user(request: Request, email: str, password: str):
+    user = await get_user_by_email(request, email)
+    if not user:
+        return False
+    try:
+        if not await verify_password_async(password, user["hashed_password"]):
+            return False
+    except PasswordPoolBusy:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Servidor ocupado, intenta de nuevo")
+
+    # Si cambió el costo de bcrypt, se aprovecha el login para regenerar el hash
+    if password_needs_rehash(user["hashed_password"]):
+        try:
+            new_hash = await hash_password_async(password)
+            await update_user_password(request, email, new_hash)
+        except PasswordPoolBusy:
+            pass
+    return user
+
+@router.post("/token")
+async def login_for_access_token(request: Request, form_data: OAuth2PasswordRequestForm = Depends()):
+    user = await authenticate_user(request, form_data.username, form_data.password)
+    if not user:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Incorrect email or password",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    access_token = create_access_token(data={"sub": user["email"], "role": user["role"]})
+    refresh_token = create_refresh_token(data={"sub": user["email"], "role": user["role"]})
+    return {"access_token": access_token, "refresh_token": refresh_token, "token_type": "bearer"}
+
+@router.post("/refresh-token")
+async def refresh_token(request: Request, refresh_token: str = Body(...)):
+    from jose import jwt, JWTError
+    try:
+        payload = jwt.decode(refresh_token, SECRET_KEY, algorithms=[ALGORITHM])
+        email = payload.get("sub")
+        role = payload.get("role")
+        if email is None or role is None:
+            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid refresh token")
+    except JWTError:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid refresh token")
+    
+    new_access_token = create_access_token(data={"sub": email, "role": role})
+    return {"access_token": new_access_token, "token_type": "bearer"}
@@ -0,0 +1,351 @@
+from fastapi import APIRouter, HTTPException, Request, Security, UploadFile, File, Form, Query
+from fastapi.responses import Response, StreamingResponse
+import asyncio
+from bson import ObjectId
+from datetime import datetime, timedelta, date
+from pymongo import UpdateOne, ReturnDocument
+from config import UPLOAD_MAX_BYTES, SSE_HEARTBEAT_SECONDS
+from database import get_collection, get_read_database
+from resilience import db_call
+from models.order_models import (
+    BulkStatusUpdateRequest, OrderStatusChange, status_change_error,
+    OrderListPage, MyOrderPage, ORDER_LIST_PROJECTION, MY_ORDER_PROJECTION, build_order_filter,
+    order_list_item_from_doc, my_order_item_from_doc,
+)
+from storage import iter_upload, UploadTooLarge
+from pagination import fetch_page, InvalidCursor
+from invoices import get_invoice_pdf, CLIENT_FIELDS
+from rollups import record_order_created, record_status_changes
+from events import order_event, format_sse
+from routers.dependencies import get_current_user, get_current_admin
+
+router = APIRouter()
+
+async def generate_order_id(request: Request) -> str:
+    """Genera un order_id único a partir de la secuencia atómica de `counters`."""
+    # Sin reintentos: el `$inc` del bloque no es idempotente (un corte solo deja un hueco)
+    return str(await db_call(request.app.order_id_allocator.next, "allocate_order_id", retries=0))
+
+@router.post("/request-service")
+async def request_service(
+    request: Request,
+    serviceType: str = Form(...),
+    amount: float = Form(...),
+    transfer_id: str = Form(...),
+    file: UploadFile = File(...),
+    user: dict = Security(get_current_user)
+):
+    """Guarda un pedido; el comprobante de pago va al almacén de blobs y el pedido solo guarda la referencia"""
+    try:
+        # ✅ Validar que el archivo sea una imagen
+        if not file.content_type.startswith("image/"):
+            raise HTTPException(status_code=400, detail="Solo se permiten imágenes")
+
+        # ✅ Generar un `order_id` único
+        order_id = await generate_order_id(request)
+
+        # ✅ El nombre queda guardado en el pedido: se lee de la base, no de la caché de autenticación
+        client = await db_call(
+            lambda: get_collection(request, "users").find_one({"_id": user["_id"]}, {"name": 1}), "find_client_name"
+        ) or {}
+
+        # ✅ Subir el archivo por bloques al almacén de blobs, con límite de tamaño; va después
+        # de todo lo que puede fallar antes del insert para no dejar blobs huérfanos
+        try:
+            file_ref = await request.app.blob_store.save(
+                iter_upload(file, UPLOAD_MAX_BYTES), file.filename, file.content_type
+            )
+        except UploadTooLarge:
+            raise HTTPException(status_code=413, detail="El comprobante supera el tamaño máximo permitido")
+        file_ref["status"] = "pending"  # Se normaliza en segundo plano
+
+        # ✅ Guardar los datos del pedido en MongoDB
+        order_data = {
+            "order_id": order_id,
+            "user_id": str(user["_id"]),
+            "client_name": client.get("name", "Sin Nombre"),
+            "serviceType": serviceType,
+            "amount": amount,
+            "transfer_id": transfer_id,
+            "file": file_ref,  # ✅ Solo la referencia al blob, no los bytes
+            "status": "Procesando Pago",
+            "created_at": datetime.utcnow()
+        }
+        try:
+            await db_call(lambda: get_collection(request, "orders").insert_one(order_data), "create_order", retries=0)
+        except Exception:
+            # No dejar blobs huérfanos si el pedido no se pudo guardar
+            await request.app.blob_store.delete(file_ref["blob_id"])
+            raise
+        await record_order_created(request.app.mongodb, order_data)
+        request.app.order_events.publish_local(order_event("order_created", order_data))
+
+        # ✅ Verificar, reducir y generar la miniatura en la cola de trabajos
+        try:
+            await request.app.job_queue.enqueue("process_receipt", {"order_id": order_id})
+        except Exception as e:
+            # El pedido ya quedó guardado; el comprobante sigue en "pending" hasta reencolarlo
+            print(f"Error al encolar el comprobante del pedido {order_id}: {e}")
+
+        return {"message": "Solicitud enviada con éxito", "order_id": order_id}
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"Error al procesar la solicitud de servicio: {e}")
+        raise HTTPException(status_code=500, detail="No se pudo procesar la solicitud")
+
+@router.get("/my-requests", response_model=MyOrderPage)
+async def get_my_requests(
+    request: Request,
+    limit: int = Query(None, ge=1),
+    after: str = Query(None),
+    user: dict = Security(get_current_user)
+):
+    """Pedidos del usuario autenticado, paginados por cursor"""
+    try:
+        orders, next_cursor = await db_call(lambda: fetch_page(
+            get_read_database(request)["orders"],
+            {"user_id": str(user["_id"])},
+            MY_ORDER_PROJECTION,
+            limit=limit,
+            after=after,
+        ), "my_requests")
+
+        return MyOrderPage(items=[my_order_item_from_doc(order) for order in orders], next_cursor=next_cursor)
+    except HTTPException:
+        raise
+    except InvalidCursor:
+        raise HTTPException(status_code=400, detail="Cursor inválido")
+    except Exception as e:
+        print(f"Error al obtener los pedidos: {e}")
+        raise HTTPException(status_code=500, detail="No se pudieron recuperar los pedidos")
+
+@router.get("/orders", response_model=OrderListPage)
+async def get_all_orders(
+    request: Request,
+    limit: int = Query(None, ge=1),
+    after: str = Query(None),
+    status: str = Query(None),
+    serviceType: str = Query(None),
+    created_from: date = Query(None),
+    created_to: date = Query(None),
+    transfer_id: str = Query(None),
+    order_id: str = Query(None),
+    client_name: str = Query(None, description="Prefijo del nombre del cliente"),
+    q: str = Query(None, description="Búsqueda de texto sobre el nombre del cliente"),
+    user: dict = Security(get_current_admin)
+):
+    """Obtiene los pedidos filtrados y paginados por cursor (solo para administradores)"""
+    try:
+        # ✅ Filtros combinables, resueltos en el servidor
+        query = build_order_filter(
+            status=status,
+            service_type=serviceType,
+            created_from=datetime.combine(created_from, datetime.min.time()) if created_from else None,
+            created_to=datetime.combine(created_to + timedelta(days=1), datetime.min.time()) if created_to else None,
+            transfer_id=transfer_id,
+            order_id=order_id,
+            client_name=client_name,
+            text=q,
+        )
+
+        # ✅ Obtener una página de pedidos, solo con los campos que se devuelven
+        orders, next_cursor = await db_call(lambda: fetch_page(
+            get_read_database(request)["orders"],
+            query,
+            ORDER_LIST_PROJECTION,
+            limit=limit,
+            after=after,
+        ), "list_orders")
+
+        # ✅ Construir la respuesta sin `file_path`, pero incluyendo el nombre del archivo
+        return OrderListPage(items=[order_list_item_from_doc(order) for order in orders], next_cursor=next_cursor)
+    except HTTPException:
+        raise
+    except InvalidCursor:
+        raise HTTPException(status_code=400, detail="Cursor inválido")
+    except Exception as e:
+        print(f"Error al obtener los pedidos: {e}")
+        raise HTTPException(status_code=500, detail="No se pudieron recuperar los pedidos")
+
+@router.put("/orders/{order_id}/update-status")
+async def update_order_status(request: Request, order_id: str, change: OrderStatusChange, user: dict = Security(get_current_admin)):
+    """Actualiza el estado de un pedido con las mismas reglas de transición que el lote"""
+    orders = get_collection(request, "orders")
+    projection = {"order_id": 1, "user_id": 1, "created_at": 1, "serviceType": 1, "amount": 1, "status": 1}
+    current = await db_call(lambda: orders.find_one({"order_id": order_id}, projection), "find_order")
+    if current is None:
+        raise HTTPException(status_code=404, detail="Pedido no encontrado")
+
+    error = status_change_error(current["status"], change.status)
+    if error == "unchanged":
+        return {"message": "Estado actualizado"}
+    if error == "invalid_status":
+        raise HTTPException(status_code=400, detail="Estado no válido")
+    if error == "invalid_transition":
+        raise HTTPException(status_code=409, detail=f"No se puede pasar de {current['status']} a {change.status}")
+
+    # El filtro incluye el estado leído para no pisar un cambio concurrente; sin reintentos,
+    # porque uno después de un intento aplicado ya no encontraría ese estado y daría 409
+    previous = await db_call(lambda: orders.find_one_and_update(
+        {"order_id": order_id, "status": current["status"]},
+        {"$set": {"status": change.status}},
+        projection=projection,
+        return_document=ReturnDocument.BEFORE
+    ), "update_order_status", retries=0)
+    if previous is None:
+        raise HTTPException(status_code=409, detail="El estado del pedido cambió, recarga e intenta de nuevo")
+    await record_status_changes(request.app.mongodb, [(previous, previous["status"], change.status)])
+    request.app.order_events.publish_local(order_event("order_status_changed", {**previous, "status": change.status}))
+    return {"message": "Estado actualizado"}
+
+@router.put("/orders/bulk-update-status")
+async def bulk_update_order_status(
+    request: Request,
+    payload: BulkStatusUpdateRequest,
+    user: dict = Security(get_current_admin)
+):
+    """Actualiza el estado de muchos pedidos con un solo `bulk_write`.
+
+    Acepta hasta BULK_STATUS_MAX_ITEMS elementos (lo valida el modelo) y un
+    cuerpo de hasta BULK_STATUS_MAX_BODY_BYTES (lo corta `BodySizeLimitMiddleware`
+    antes de leerlo). Devuelve el resultado de cada elemento:
+    `updated`, `unchanged`, `not_found`, `invalid_status`,
+    `invalid_transition`, `duplicate` o `conflict` (el estado cambió
+    mientras se procesaba el lote).
+    """
+    orders = get_collection(request, "orders")
+    order_ids = list({item.order_id for item in payload.updates})
+    found = await db_call(lambda: orders.find(
+        {"order_id": {"$in": order_ids}}, {"order_id": 1, "user_id": 1, "status": 1, "created_at": 1, "serviceType": 1, "amount": 1}
+    ).to_list(None), "find_orders_for_bulk_status")
+    current = {order["order_id"]: order for order in found}
+
+    results = []
+    operations = []
+    pending = []
+    seen = set()
+    for item in payload.updates:
+        result = {"order_id": item.order_id, "status": item.status}
+        old_status = current[item.order_id]["status"] if item.order_id in current else None
+        error = status_change_error(old_status, item.status) if old_status is not None else None
+        if item.order_id in seen:
+            result["result"] = "duplicate"
+        elif old_status is None:
+            result["result"] = "not_found"
+        elif error:
+            result["result"] = error
+            if error == "invalid_transition":
+                result["previous_status"] = old_status
+        else:
+            # El filtro incluye el estado leído para no pisar un cambio concurrente
+            operations.append(UpdateOne(
+                {"order_id": item.order_id, "status": old_status},
+                {"$set": {"status": item.status}}
+            ))
+            result["previous_status"] = old_status
+            pending.append(result)
+        seen.add(item.order_id)
+        results.append(result)
+
+    if operations:
+        write_result = await db_call(lambda: orders.bulk_write(operations, ordered=False), "bulk_update_status", retries=0)
+        if write_result.matched_count == len(operations):
+            for result in pending:
+                result["result"] = "updated"
+        else:
+            # Algunos no coincidieron: releer solo esos pedidos para saber cuáles se aplicaron
+            rechecked = await db_call(lambda: orders.find(
+                {"order_id": {"$in": [r["order_id"] for r in pending]}}, {"order_id": 1, "status": 1}
+            ).to_list(None), "recheck_bulk_status")
+            applied = {order["order_id"]: order["status"] for order in rechecked}
+            for result in pending:
+                result["result"] = "updated" if applied.get(result["order_id"]) == result["status"] else "conflict"
+
+        await record_status_changes(request.app.mongodb, [
+            (current[r["order_id"]], r["previous_status"], r["status"]) for r in pending if r["result"] == "updated"
+        ])
+        for r in pending:
+            if r["result"] == "updated":
+                request.app.order_events.publish_local(
+                    order_event("order_status_changed", {**current[r["order_id"]], "status": r["status"]})
+                )
+
+    return {"results": results}
+
+@router.get("/orders/{order_id}/invoice")
+async def generate_invoice(request: Request, order_id: str, user: dict = Security(get_current_admin)):
+    """Genera un PDF con la información completa del pedido y el cliente"""
+    try:
+        # Obtener el pedido de la base de datos
+        order = await db_call(lambda: get_collection(request, "orders").find_one({"order_id": order_id}), "find_order")
+        if not order:
+            raise HTTPException(status_code=404, detail="Pedido no encontrado")
+
+        # Convertir `user_id` a ObjectId para buscar en MongoDB
+        user_id = order["user_id"]
+        if not ObjectId.is_valid(user_id):
+            raise HTTPException(status_code=400, detail="El ID del usuario no es válido")
+
+        client = await db_call(lambda: get_collection(request, "users").find_one(
+            {"_id": ObjectId(user_id)}, {field: 1 for field in CLIENT_FIELDS}
+        ), "find_invoice_client")
+        if not client:
+            raise HTTPException(status_code=404, detail="Cliente no encontrado")
+
+        # Render en el pool de procesos, o directo desde la caché si no cambió nada
+        pdf_bytes = await get_invoice_pdf(order, client)
+
+        return Response(
+            pdf_bytes,
+            media_type="application/pdf",
+            headers={"Content-Disposition": f'attachment; filename="{order_id}.pdf"'}
+        )
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"Error al generar el PDF: {e}")
+        raise HTTPException(status_code=500, detail="Error al generar el PDF")
+
+@router.get("/events/orders")
+async def stream_order_events(
+    request: Request,
+    last_event_id: str = Query(None),
+    user: dict = Security(get_current_user)
+):
+    """Server-Sent Events con los cambios de pedidos.
+
+    Un cliente recibe solo los eventos de sus pedidos; un administrador
+    recibe los de todos (pedidos nuevos y cambios de estado). Se admite
+    reconectar con `Last-Event-ID` (o `?last_event_id=`). El token va solo en
+    `Authorization`, nunca en la URL, para que no quede en los logs de acceso.
+    """
+    broker = request.app.order_events
+    if user.get("role") == "admin":
+        predicate = lambda event: True
+    else:
+        user_id = str(user["_id"])
+        predicate = lambda event: event.get("user_id") == user_id
+
+    subscription = broker.subscribe(predicate, request.headers.get("last-event-id") or last_event_id)
+
+    async def event_stream():
+        try:
+            yield b"retry: 5000\n\n"
+            while not await request.is_disconnected():
+                try:
+                    event = await asyncio.wait_for(subscription.queue.get(), timeout=SSE_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    yield b": ping\n\n"  # Heartbeat para que proxies y clientes no cierren la conexión
+                    continue
+                yield format_sse(event)
+        finally:
+            broker.unsubscribe(subscription)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
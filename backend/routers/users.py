@@ -0,0 +1,31 @@
+from fastapi import APIRouter, HTTPException, status, Request, Security
+from database import get_user_by_email, update_user_profile
+from models.user_models import UserResponse, UserUpdate, user_response_from_doc
+from routers.dependencies import get_current_user
+
+router = APIRouter()
+
+# RUTA PARA OBTENER EL PERFIL DEL USUARIO
+@router.get("/users/me", response_model=UserResponse)
+async def read_user_me(
+    request: Request,
+    user: dict = Security(get_current_user)
+):
+    # La caché por proceso solo autoriza: el perfil se lee de la base para ver
+    # lo que se haya guardado desde otro worker
+    profile = await get_user_by_email(request, user["email"])
+    if profile:
+        return user_response_from_doc(profile)
+    raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
+
+@router.put("/users/me", response_model=UserResponse)
+async def update_user_me(
+    request: Request,
+    profile: UserUpdate,
+    user: dict = Security(get_current_user)
+):
+    # 🚀 Una sola operación: actualiza, bloquea el Número de ID la primera vez y devuelve el usuario
+    updated_user = await update_user_profile(request, user["email"], profile.model_dump())
+    if updated_user:
+        return user_response_from_doc(updated_user)
+    raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="No se pudo actualizar el perfil")
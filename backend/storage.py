@@ -0,0 +1,189 @@
+import hashlib
+import os
+import uuid
+from bson import ObjectId
+from starlette.concurrency import run_in_threadpool
+from motor.motor_asyncio import AsyncIOMotorGridFSBucket
+from config import BLOB_BACKEND, BLOB_LOCAL_DIR, BLOB_GRIDFS_BUCKET, UPLOAD_CHUNK_SIZE
+
+
+class UploadTooLarge(Exception):
+    """El archivo subido supera el tamaño máximo permitido."""
+
+
+async def iter_upload(file, max_bytes: int, chunk_size: int = UPLOAD_CHUNK_SIZE):
+    """Lee un `UploadFile` por bloques, cortando si supera `max_bytes`."""
+    total = 0
+    while True:
+        chunk = await file.read(chunk_size)
+        if not chunk:
+            break
+        total += len(chunk)
+        if total > max_bytes:
+            raise UploadTooLarge()
+        yield chunk
+
+
+def parse_range(header: str, length: int):
+    """Interpreta un encabezado `Range: bytes=a-b` (un solo rango).
+
+    Devuelve `(start, end)` inclusivo, `None` si no hay rango utilizable o
+    lanza `ValueError` si el rango no se puede satisfacer.
+    """
+    if not header or not header.startswith("bytes=") or "," in header:
+        return None
+    start_s, _, end_s = header[len("bytes="):].strip().partition("-")
+    try:
+        if start_s == "":
+            # Sufijo: los últimos N bytes
+            suffix = int(end_s)
+            if suffix <= 0:
+                raise ValueError("Rango no satisfacible")
+            return max(length - suffix, 0), length - 1
+        start = int(start_s)
+        end = int(end_s) if end_s else length - 1
+    except ValueError:
+        raise ValueError("Rango no satisfacible")
+    if start >= length or start > end:
+        raise ValueError("Rango no satisfacible")
+    return start, min(end, length - 1)
+
+
+class BlobStore:
+    """Interfaz común de los almacenes de comprobantes.
+
+    `save` recibe un iterador asíncrono de bloques y devuelve la referencia
+    que se guarda en el pedido; `open_range` devuelve los bytes del rango
+    inclusivo `[start, end]` como iterador asíncrono.
+    """
+
+    backend = None
+
+    async def save(self, chunks, filename: str, content_type: str) -> dict:
+        raise NotImplementedError
+
+    def open_range(self, blob_id: str, start: int, end: int, chunk_size: int = UPLOAD_CHUNK_SIZE):
+        raise NotImplementedError
+
+    async def delete(self, blob_id: str):
+        raise NotImplementedError
+
+    async def read(self, blob_id: str, length: int) -> bytes:
+        """Lee un blob completo en memoria (solo para archivos acotados)."""
+        parts = [chunk async for chunk in self.open_range(blob_id, 0, length - 1)] if length else []
+        return b"".join(parts)
+
+    async def save_bytes(self, data: bytes, filename: str, content_type: str) -> dict:
+        async def chunks():
+            for i in range(0, len(data), UPLOAD_CHUNK_SIZE):
+                yield data[i:i + UPLOAD_CHUNK_SIZE]
+        return await self.save(chunks(), filename, content_type)
+
+
+class GridFSBlobStore(BlobStore):
+    backend = "gridfs"
+
+    def __init__(self, db, bucket_name: str = BLOB_GRIDFS_BUCKET):
+        self.bucket = AsyncIOMotorGridFSBucket(db, bucket_name=bucket_name)
+
+    async def save(self, chunks, filename: str, content_type: str) -> dict:
+        digest = hashlib.sha256()
+        length = 0
+        grid_in = self.bucket.open_upload_stream(filename, metadata={"contentType": content_type})
+        try:
+            async for chunk in chunks:
+                digest.update(chunk)
+                length += len(chunk)
+                await grid_in.write(chunk)
+        except BaseException:
+            await grid_in.abort()
+            raise
+        await grid_in.close()
+        return {
+            "backend": self.backend,
+            "blob_id": str(grid_in._id),
+            "filename": filename,
+            "content_type": content_type,
+            "length": length,
+            "sha256": digest.hexdigest(),
+        }
+
+    async def open_range(self, blob_id: str, start: int, end: int, chunk_size: int = UPLOAD_CHUNK_SIZE):
+        grid_out = await self.bucket.open_download_stream(ObjectId(blob_id))
+        grid_out.seek(start)
+        remaining = end - start + 1
+        while remaining > 0:
+            chunk = await grid_out.read(min(chunk_size, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+    async def delete(self, blob_id: str):
+        await self.bucket.delete(ObjectId(blob_id))
+
+
+class LocalBlobStore(BlobStore):
+    backend = "local"
+
+    def __init__(self, root: str = BLOB_LOCAL_DIR):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+
+    def _path(self, blob_id: str) -> str:
+        # Los IDs son UUID hex generados aquí; se rechaza cualquier otra cosa
+        return os.path.join(self.root, uuid.UUID(hex=blob_id).hex)
+
+    async def save(self, chunks, filename: str, content_type: str) -> dict:
+        blob_id = uuid.uuid4().hex
+        path = self._path(blob_id)
+        digest = hashlib.sha256()
+        length = 0
+        fh = await run_in_threadpool(open, path + ".part", "wb")
+        try:
+            async for chunk in chunks:
+                digest.update(chunk)
+                length += len(chunk)
+                await run_in_threadpool(fh.write, chunk)
+            await run_in_threadpool(fh.close)
+            await run_in_threadpool(os.replace, path + ".part", path)
+        except BaseException:
+            fh.close()
+            if os.path.exists(path + ".part"):
+                os.remove(path + ".part")
+            raise
+        return {
+            "backend": self.backend,
+            "blob_id": blob_id,
+            "filename": filename,
+            "content_type": content_type,
+            "length": length,
+            "sha256": digest.hexdigest(),
+        }
+
+    async def open_range(self, blob_id: str, start: int, end: int, chunk_size: int = UPLOAD_CHUNK_SIZE):
+        fh = await run_in_threadpool(open, self._path(blob_id), "rb")
+        try:
+            await run_in_threadpool(fh.seek, start)
+            remaining = end - start + 1
+            while remaining > 0:
+                chunk = await run_in_threadpool(fh.read, min(chunk_size, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                yield chunk
+        finally:
+            fh.close()
+
+    async def delete(self, blob_id: str):
+        path = self._path(blob_id)
+        if os.path.exists(path):
+            await run_in_threadpool(os.remove, path)
+
+
+def create_blob_store(db, backend: str = BLOB_BACKEND) -> BlobStore:
+    if backend == "gridfs":
+        return GridFSBlobStore(db)
+    if backend == "local":
+        return LocalBlobStore()
+    raise ValueError(f"BLOB_BACKEND desconocido: {backend}")
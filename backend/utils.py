@@ -1,9 +1,60 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
 from passlib.context import CryptContext
+from config import BCRYPT_ROUNDS, PASSWORD_HASH_WORKERS, PASSWORD_HASH_MAX_PENDING
+
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=BCRYPT_ROUNDS)
+
+# bcrypt libera el GIL, así que un pool de hilos escala con los núcleos disponibles
+_hash_executor = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="bcrypt")
+_hash_semaphore = None
+
+# Métricas del pool: tareas esperando turno, tareas en ejecución y completadas
+password_pool_stats = {"waiting": 0, "in_flight": 0, "completed": 0, "rejected": 0}
+
+
+class PasswordPoolBusy(Exception):
+    """La cola de hashing superó PASSWORD_HASH_MAX_PENDING."""
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 def hash_password(password: str) -> str:
     return pwd_context.hash(password)
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
+
+def password_needs_rehash(hashed_password: str) -> bool:
+    """Indica si el hash se generó con un costo distinto al configurado."""
+    return pwd_context.needs_update(hashed_password)
+
+async def _run_in_hash_pool(func, *args):
+    global _hash_semaphore
+    if _hash_semaphore is None:
+        _hash_semaphore = asyncio.Semaphore(PASSWORD_HASH_WORKERS)
+
+    if password_pool_stats["waiting"] >= PASSWORD_HASH_MAX_PENDING:
+        password_pool_stats["rejected"] += 1
+        raise PasswordPoolBusy()
+
+    password_pool_stats["waiting"] += 1
+    try:
+        await _hash_semaphore.acquire()
+    finally:
+        password_pool_stats["waiting"] -= 1
+
+    password_pool_stats["in_flight"] += 1
+    try:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_hash_executor, func, *args)
+    finally:
+        password_pool_stats["in_flight"] -= 1
+        password_pool_stats["completed"] += 1
+        _hash_semaphore.release()
+
+async def hash_password_async(password: str) -> str:
+    """Genera el hash bcrypt en el pool de hilos sin bloquear el event loop."""
+    return await _run_in_hash_pool(hash_password, password)
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """Verifica la contraseña en el pool de hilos sin bloquear el event loop."""
+    return await _run_in_hash_pool(verify_password, plain_password, hashed_password)
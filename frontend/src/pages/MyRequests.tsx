@@ -13,23 +13,26 @@ const MyRequests = () => {
   const { user } = useAuth();
   const [orders, setOrders] = useState<Order[]>([]);
   const [loading, setLoading] = useState(true);
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
 
-  useEffect(() => {
-    const fetchOrders = async () => {
-      try {
-        const response = await axios.get('/my-requests', {
-          headers: {
-            Authorization: `Bearer ${sessionStorage.getItem('token')}`
-          }
-        });
-        setOrders(response.data);
-      } catch (error) {
-        console.error("Error al obtener los pedidos:", error);
-      } finally {
-        setLoading(false);
-      }
-    };
+  const fetchOrders = async (after?: string) => {
+    try {
+      const response = await axios.get('/my-requests', {
+        headers: {
+          Authorization: `Bearer ${sessionStorage.getItem('token')}`
+        },
+        params: after ? { after } : {}
+      });
+      setOrders(prev => after ? [...prev, ...response.data.items] : response.data.items);
+      setNextCursor(response.data.next_cursor);
+    } catch (error) {
+      console.error("Error al obtener los pedidos:", error);
+    } finally {
+      setLoading(false);
+    }
+  };
 
+  useEffect(() => {
     if (user) {
       fetchOrders();
     }
@@ -70,6 +73,12 @@ const MyRequests = () => {
             </tbody>
           </table>
         )}
+
+        {nextCursor && (
+          <button className="mt-4 w-full p-2 border rounded text-blue-500" onClick={() => fetchOrders(nextCursor)}>
+            Cargar más pedidos
+          </button>
+        )}
       </div>
     </div>
   );
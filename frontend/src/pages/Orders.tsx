@@ -1,4 +1,5 @@
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useRef } from 'react';
+import { isAxiosError } from 'axios';
 import axios from '../api';
 import { useAuth } from '../context/AuthContext';
 
@@ -14,32 +15,70 @@ interface Order {
 
 const STATUS_OPTIONS = ["Procesando Pago", "Aprobado", "Finalizado", "Cancelado"];
 
+// Mismas transiciones que ALLOWED_STATUS_TRANSITIONS en el backend
+const STATUS_TRANSITIONS: Record<string, string[]> = {
+  "Procesando Pago": ["Aprobado", "Cancelado"],
+  "Aprobado": ["Procesando Pago", "Finalizado", "Cancelado"],
+  "Finalizado": ["Aprobado"],
+  "Cancelado": ["Procesando Pago"],
+};
+
+const statusOptionsFor = (current: string) =>
+  STATUS_OPTIONS.filter(status => status === current || STATUS_TRANSITIONS[current]?.includes(status));
+
 const Orders = () => {
   const { user } = useAuth();
   const [orders, setOrders] = useState<Order[]>([]);
   const [search, setSearch] = useState('');
+  const [statusFilter, setStatusFilter] = useState('');
   const [loading, setLoading] = useState(true);
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
+  const requestId = useRef(0);
+
+  // Los filtros se resuelven en el servidor: un número busca por ID de pedido, el resto por nombre del cliente
+  const buildFilters = () => {
+    const params: Record<string, string> = {};
+    const term = search.trim();
+    if (/^\d+$/.test(term)) {
+      params.order_id = term;
+    } else if (term) {
+      params.q = term;
+    }
+    if (statusFilter) {
+      params.status = statusFilter;
+    }
+    return params;
+  };
+
+  const fetchOrders = async (after?: string) => {
+    const current = ++requestId.current;
+    try {
+      const response = await axios.get('/orders', {
+        headers: {
+          Authorization: `Bearer ${sessionStorage.getItem('token')}`
+        },
+        params: after ? { ...buildFilters(), after } : buildFilters()
+      });
+      // Ignorar respuestas de filtros que ya cambiaron
+      if (current !== requestId.current) return;
+      setOrders(prev => after ? [...prev, ...response.data.items] : response.data.items);
+      setNextCursor(response.data.next_cursor);
+    } catch (error) {
+      console.error("Error al obtener los pedidos:", error);
+    } finally {
+      if (current === requestId.current) setLoading(false);
+    }
+  };
 
   useEffect(() => {
-    const fetchOrders = async () => {
-      try {
-        const response = await axios.get('/orders', {
-          headers: {
-            Authorization: `Bearer ${sessionStorage.getItem('token')}`
-          }
-        });
-        setOrders(response.data);
-      } catch (error) {
-        console.error("Error al obtener los pedidos:", error);
-      } finally {
-        setLoading(false);
-      }
-    };
-  
-    if (user?.role === "admin") {
+    if (user?.role !== "admin") return;
+    // Espera a que se deje de escribir antes de consultar
+    const timer = setTimeout(() => {
+      setLoading(true);
       fetchOrders();
-    }
-  }, [user]);
+    }, 300);
+    return () => clearTimeout(timer);
+  }, [user, search, statusFilter]);
 
   const updateOrderStatus = async (orderId: string, newStatus: string) => {
     try {
@@ -51,6 +90,9 @@ const Orders = () => {
       setOrders(orders.map(order => order.order_id === orderId ? { ...order, status: newStatus } : order));
     } catch (error) {
       console.error("Error al actualizar el estado del pedido:", error);
+      // p. ej. 409 si otro administrador cambió el estado mientras tanto
+      const detail = isAxiosError(error) ? error.response?.data?.detail : undefined;
+      alert(typeof detail === "string" ? detail : "No se pudo actualizar el estado del pedido.");
     }
   };
 
@@ -71,13 +113,6 @@ const Orders = () => {
     }
   };
 
-  const filteredOrders = orders.filter(order =>
-    order.order_id.includes(search) ||
-    order.client_name.toLowerCase().includes(search.toLowerCase()) ||
-    order.status.toLowerCase().includes(search.toLowerCase()) ||
-    order.created_at.includes(search)
-  );
-
   const downloadPaymentProof = async (orderId: string | undefined) => {
     if (!orderId) {
       alert("El ID del pedido es inválido.");
@@ -109,18 +144,30 @@ const Orders = () => {
       <div className="bg-white p-6 rounded-lg shadow-md w-full max-w-5xl">
         <h2 className="text-2xl font-bold mb-4 text-center">Gestión de Pedidos</h2>
 
-        {/* Barra de Búsqueda */}
-        <input
-          type="text"
-          placeholder="Buscar por ID, Cliente, Estado o Fecha"
-          className="w-full p-2 mb-4 border rounded"
-          value={search}
-          onChange={(e) => setSearch(e.target.value)}
-        />
+        {/* Barra de Búsqueda y filtro de estado */}
+        <div className="flex gap-2 mb-4">
+          <input
+            type="text"
+            placeholder="Buscar por ID del pedido o nombre del cliente"
+            className="flex-1 p-2 border rounded"
+            value={search}
+            onChange={(e) => setSearch(e.target.value)}
+          />
+          <select
+            className="p-2 border rounded"
+            value={statusFilter}
+            onChange={(e) => setStatusFilter(e.target.value)}
+          >
+            <option value="">Todos los estados</option>
+            {STATUS_OPTIONS.map(status => (
+              <option key={status} value={status}>{status}</option>
+            ))}
+          </select>
+        </div>
 
         {loading ? (
           <p className="text-center text-gray-500">Cargando pedidos...</p>
-        ) : filteredOrders.length === 0 ? (
+        ) : orders.length === 0 ? (
           <p className="text-center text-gray-500">No hay pedidos registrados.</p>
         ) : (
           <table className="w-full border-collapse border border-gray-300">
@@ -135,7 +182,7 @@ const Orders = () => {
               </tr>
             </thead>
             <tbody>
-              {filteredOrders.map((order) => (
+              {orders.map((order) => (
                 <tr key={order.order_id} className="text-center">
                   <td className="border p-2">
                     <button className="text-blue-500 underline" onClick={() => downloadInvoicePDF(order.order_id)}>
@@ -159,7 +206,7 @@ const Orders = () => {
                       value={order.status}
                       onChange={(e) => updateOrderStatus(order.order_id, e.target.value)}
                     >
-                      {STATUS_OPTIONS.map(status => (
+                      {statusOptionsFor(order.status).map(status => (
                         <option key={status} value={status}>{status}</option>
                       ))}
                     </select>
@@ -170,6 +217,12 @@ const Orders = () => {
             </tbody>
           </table>
         )}
+
+        {nextCursor && (
+          <button className="mt-4 w-full p-2 border rounded text-blue-500" onClick={() => fetchOrders(nextCursor)}>
+            Cargar más pedidos
+          </button>
+        )}
       </div>
     </div>
   );